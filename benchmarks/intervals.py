@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+
+"""
+Scaling of combine and Intervals construction, up to a million segs
+Time per seg should stay flat as the count grows tenfold; sorting, when needed,
+adds the only log factor.
+Usage, from the top directory: python3 -m benchmarks.intervals [largest power of ten]
+"""
+
+import random
+import time
+from sys import argv
+
+from structer.intervals import Intervals, Seg, combine
+
+def adjacent(count):
+    """ count segs in address order, each continuing the previous one """
+    return [Seg(index << 12, index << 12, 1 << 12) for index in range(count)]
+
+def shuffled(count):
+    """ count segs separated by gaps, in random order """
+    segs = [Seg(index << 13, index << 12, 1 << 12) for index in range(count)]
+    random.Random(count).shuffle(segs)
+    return segs
+
+def seconds(function, segs):
+    """ Seconds for one call of function on segs """
+    start = time.perf_counter()
+    function(segs)
+    return time.perf_counter() - start
+
+def main():
+    """ Print seconds, and nanoseconds per seg, for each size """
+    largest = int(argv[1]) if len(argv) > 1 else 6
+    for power in range(4, largest + 1):
+        count = 10 ** power
+        for name, segs in (('adjacent', adjacent(count)), ('shuffled', shuffled(count))):
+            for function in (combine, Intervals):
+                elapsed = seconds(function, segs)
+                print(f"{count:>8} {name:8} {function.__name__:9} "
+                      f"{elapsed:8.3f}s {elapsed * 1e9 / count:8.0f}ns/seg")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+"""
+Round trip check of seekable against the raw bytes, for each codec
+Data is synthesized and compressed in single and multiple frame layouts;
+random slices must match the raw bytes. zstd and lz4 are skipped if not importable.
+Usage, from the top directory: python3 -m benchmarks.seekable [megabytes]
+"""
+
+import gzip
+import lzma
+import os
+import random
+import time
+from sys import argv
+from tempfile import TemporaryDirectory
+
+from structer.seekable import Seekable, seekable
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+def synthesize(size, rng):
+    """ Runs of random bytes alternating with runs of nulls, as in a core """
+    raw = bytearray()
+    while len(raw) < size:
+        length = rng.randint(1, 1 << 16)
+        raw += rng.randbytes(length) if rng.random() < 0.5 else bytes(4 * length)
+    return bytes(raw[:size])
+
+def frames(compress, raw, count):
+    """ raw split into count independently compressed, concatenated frames """
+    step = -(-len(raw) // count)
+    return b''.join(compress(raw[start:start + step]) for start in range(0, len(raw), step))
+
+def layouts():
+    """ (name, compress) for each available codec and frame layout """
+    yield 'gzip', gzip.compress
+    yield 'gzip members', lambda raw: frames(gzip.compress, raw, 5)
+    yield 'xz', lzma.compress
+    yield 'xz streams', lambda raw: frames(lzma.compress, raw, 5)
+    if zstandard is None:
+        print("zstd skipped: zstandard is not importable")
+    else:
+        compress = zstandard.ZstdCompressor().compress
+        yield 'zstd frames', lambda raw: frames(compress, raw, 5)
+    if lz4 is None:
+        print("lz4 skipped: lz4 is not importable")
+    else:
+        yield 'lz4 frames', lambda raw: frames(lz4.frame.compress, raw, 5)
+
+def check(name, raw, rng, reads=200):
+    """ Compare the whole file and random slices against raw, returning seconds """
+    mem = seekable(name, blocksize=1 << 16, cache=16)
+    assert isinstance(mem, Seekable), f"{name} not recognized as compressed"
+    start = time.perf_counter()
+    assert len(mem) == len(raw), f"{name}: length {len(mem)}, not {len(raw)}"
+    for _ in range(reads):
+        offset = rng.randrange(len(raw))
+        size = rng.randint(1, 1 << 18)
+        assert bytes(mem[offset:offset + size]) == raw[offset:offset + size], \
+            f"{name}: mismatch at {offset}"
+    assert bytes(mem[:]) == raw, f"{name}: mismatch reading the whole file"
+    return time.perf_counter() - start
+
+def main():
+    """ Print seconds for each codec and layout, failing on any mismatch """
+    size = int(argv[1]) << 20 if len(argv) > 1 else 16 << 20
+    rng = random.Random(size)
+    raw = synthesize(size, rng)
+    with TemporaryDirectory() as directory:
+        for label, compress in layouts():
+            name = os.path.join(directory, label.replace(' ', '_'))
+            with open(name, 'wb') as file:
+                file.write(compress(raw))
+            print(f"{label:12} {check(name, raw, rng):8.3f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+
+"""
+Stress check for objects shared between threads
+Many threads race on first accesses of cached attributes, lazily indexed dicts,
+keyword variant derivation, and Elf header classes of one shared Elf,
+asserting that each value is computed once and that every thread sees it.
+A tiny switch interval widens race windows which the GIL otherwise keeps small.
+Usage, from the top directory: python3 -m benchmarks.threads [threads] [rounds]
+"""
+
+import gc
+import pickle
+import sys
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from structer import CacheAttr, LazyDict, memmap
+from structer.data import Int, String
+from structer.elf import Elf
+
+class Counted(object):
+    """ CacheAttr whose computation is slow, and counted """
+    calls = 0
+
+    @CacheAttr
+    def value(self):
+        """ Slow computation, which must run only once per instance """
+        type(self).calls += 1
+        time.sleep(0.001)
+        return object()
+
+def stress(threads, rounds):
+    """ Run every check rounds times with the specified number of threads """
+    with ThreadPoolExecutor(threads) as executor:
+        for _ in range(rounds):
+            shared, Counted.calls = Counted(), 0
+            values = set(map(id, executor.map(lambda _: shared.value, range(threads * 4))))
+            assert Counted.calls == 1 and len(values) == 1, (Counted.calls, values)
+            assert set(vars(shared)) == {'value'}, vars(shared)
+            assert not Counted.value.locks, Counted.value.locks
+
+            lazy = LazyDict((key, -key) for key in range(10000))
+            found = executor.map(lambda key: lazy[key] == -key, range(9999, -1, -3))
+            assert all(found) and len(lazy) == 10000
+
+            variants = set(executor.map(lambda _: Int(length=3, byteorder=2), range(threads * 4)))
+            assert len(variants) == 1, variants
+
+            elf = Elf(memmap(sys.executable), sys.executable)
+            classes = set(executor.map(lambda _: elf.Shdr, range(threads * 4)))
+            assert len(classes) == 1, classes
+            sections = set(map(id, executor.map(lambda _: elf.sections, range(threads * 4))))
+            assert len(sections) == 1, sections
+
+            string = String(length=8)(b'shared\0\0')
+            assert set(executor.map(lambda _: str(string), range(threads))) == {'shared'}
+            assert pickle.loads(pickle.dumps(string)).text == 'shared'
+
+            alive = weakref.ref(elf)
+            del elf, classes
+            for _ in range(1000):
+                gc.collect()
+                if alive() is None:
+                    break
+                # a worker frame may still hold its result just after the future completes
+                time.sleep(0.001)
+            assert alive() is None, "Elf kept alive by variant memoization"
+
+def main():
+    """ Run the stress check and report its duration """
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    start, interval = time.perf_counter(), sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        stress(threads, rounds)
+    finally:
+        sys.setswitchinterval(interval)
+    print(f"ok: {threads} threads, {rounds} rounds, {time.perf_counter() - start:.2f}s, "
+          f"GIL {'enabled' if getattr(sys, '_is_gil_enabled', lambda: True)() else 'disabled'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+
+"""
+Time and allocation peaks for VarStruct parsing and keyword variant derivation
+Notes and a cpio archive are synthesized in memory, so no input files are needed.
+Usage, from the top directory: python3 -m benchmarks.varstruct [count]
+"""
+
+import struct
+import time
+import tracemalloc
+from sys import argv
+
+from structer import cpio
+from structer.data import Long
+from structer.elf import header
+from structer.named import VarStructArray
+
+def notes(count):
+    """ count GNU build ID notes, little endian """
+    note = struct.pack('<III', 4, 20, 3) + b'GNU\0' + bytes(range(20))
+    return memoryview(note * count)
+
+def archive(count):
+    """ cpio newc archive of count small files, and its trailer """
+    pieces = []
+    for index, name in enumerate([f'./f{index:06d}' for index in range(count)] + ['TRAILER!!!']):
+        data = b'x' * (index % 97) if name != 'TRAILER!!!' else b''
+        fields = (index + 1, 0o100644, 0, 0, 1, 0, len(data), 0, 0, 0, 0, len(name) + 1, 0)
+        head = b'070701' + b''.join(b'%08x' % field for field in fields) + name.encode() + b'\0'
+        pieces.append(head + b'\0' * (-len(head) % 4) + data + b'\0' * (-len(data) % 4))
+    return memoryview(b''.join(pieces))
+
+class Owner(object):
+    """ Supplies a bound method keyword, which disables variant memoization """
+    def fetch(self, addr, size=0):
+        """ Placeholder fetch """
+        return addr, size
+
+def measure(function):
+    """ Seconds for one run, and peak traced bytes for another """
+    function()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start, peak
+
+def main():
+    """ Print seconds and peak bytes for each benchmark """
+    count = int(argv[1]) if len(argv) > 1 else 20000
+    mem, members, owner = notes(count), archive(count), Owner()
+    note = header.Note(byteorder=1, wordsize=2)
+    def iterate_notes():
+        for _ in VarStructArray(mem, note):
+            pass
+    def walk_cpio():
+        for _ in cpio.archive(members):
+            pass
+    def memoized_variants():
+        for _ in range(count):
+            Long(wordsize=2, byteorder=1)
+    def unmemoized_variants():
+        for _ in range(count // 100):
+            header.Note(byteorder=1, wordsize=2, fetch=owner.fetch)
+    for function in (iterate_notes, walk_cpio, memoized_variants, unmemoized_variants):
+        seconds, peak = measure(function)
+        print(f"{function.__name__:20} {seconds:8.3f}s {peak:12d} bytes peak")
+
+if __name__ == '__main__':
+    main()
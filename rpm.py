@@ -1,14 +1,19 @@
 #!/usr/bin/python3
 
-from sys import argv
+from sys import argv, stdin
 from structer import memmap
-from structer.rpm import RPM
+from structer.rpm import RPM, RPMStream
 
 def build_ids(name):
-    """ Harvest build IDs from members which have them """
-    rpm = RPM(memmap(name))
+    """
+    Harvest build IDs from members which have them, naming every hard link
+    The name - reads the RPM from standard input
+    """
+    rpm = RPMStream(stdin.buffer) if name == '-' else RPM(memmap(name))
     for elf in rpm.elves():
-        yield elf.build_id(), elf.name
+        build_id = elf.build_id()
+        for link in elf.names:
+            yield build_id, link
 
 if __name__ == '__main__':
     for build_id, name in build_ids(argv[1]):
@@ -24,6 +24,7 @@ setup(name='structer',
       entry_points={
           'console_scripts': [
               'build_ids = structer.build_ids:main',
+              'core_triage = structer.triage:main',
               ]
           }
      )
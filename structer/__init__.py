@@ -4,34 +4,113 @@ The namespace classes and metaclasses here allow variants
 of classes to be generated by calling them with keyword arguments.
 """
 
-from os import stat
-from mmap import mmap, PROT_READ
+import copyreg
+from importlib import import_module
+from errno import ENXIO
+from os import stat, lseek, SEEK_DATA, SEEK_HOLE
+from pickle import PicklingError
+from types import MethodType
+from threading import Lock, RLock
+from weakref import WeakValueDictionary
+from mmap import mmap, PROT_READ, PAGESIZE
 
-def memmap(name):
+# madvise hints, None where the platform or Python version lacks them
+MADV_NORMAL, MADV_RANDOM, MADV_SEQUENTIAL, MADV_WILLNEED, MADV_DONTNEED = (
+    getattr(import_module('mmap'), 'MADV_' + name, None)
+    for name in ('NORMAL', 'RANDOM', 'SEQUENTIAL', 'WILLNEED', 'DONTNEED'))
+
+def memmap(name, advice=None):
     """
     memoryview over readonly mmap of file with specified name
     Allow empty files even if mmap rejects them
+    advice, if specified, is an mmap.MADV_* value for the whole file.
     """
     with open(name, 'rb') as file:
         try:
-            return memoryview(mmap(file.fileno(), 0, access=PROT_READ))
+            mem = memoryview(mmap(file.fileno(), 0, access=PROT_READ))
         except ValueError:
             assert stat(file.fileno()).st_size == 0
             return memoryview(b'')
+    if advice is not None:
+        advise(mem, advice)
+    return mem
+
+def advise(mem, advice, offset=0, length=None):
+    """
+    Apply an mmap.MADV_* hint to a byte range of a memmap result
+    The range is widened to page boundaries, and clipped to the mapping.
+    Anything other than an entire mmap (such as a slice) is left alone,
+    because offsets within the mapping are then unknown.
+    Hints are ignored where madvise is unavailable (advice is then None).
+    """
+    mapping = getattr(mem, 'obj', None)
+    if advice is None or not isinstance(mapping, mmap) or mem.nbytes != len(mapping):
+        return
+    if not hasattr(mapping, 'madvise'):
+        return
+    end = len(mapping) if length is None else min(offset + length, len(mapping))
+    offset -= offset % PAGESIZE
+    if end > offset:
+        mapping.madvise(advice, offset, end - offset)
+
+def extents(mem, name):
+    """
+    Data extents of a sparse file, as (start, end) offsets, or None if unknown
+    mem must be an entire memmap result of the named file.
+    Found via SEEK_DATA and SEEK_HOLE; filesystems without holes report one extent.
+    """
+    mapping = getattr(mem, 'obj', None)
+    if name is None or not isinstance(mapping, mmap) or mem.nbytes != len(mapping):
+        return None
+    found, offset = [], 0
+    with open(name, 'rb') as file:
+        fileno = file.fileno()
+        if stat(fileno).st_size != len(mapping):
+            return None
+        while offset < len(mapping):
+            try:
+                start = lseek(fileno, offset, SEEK_DATA)
+            except OSError as exc:
+                if exc.errno == ENXIO:
+                    break
+                return None
+            offset = lseek(fileno, start, SEEK_HOLE)
+            found.append((start, offset))
+    return found
 
 class CacheAttr(object):
     """
     Descriptor which replaces itself with the value it returns
+    Concurrent first accesses compute the value once, using a lock
+    per instance held by the descriptor, keyed by id and dropped once
+    the last waiter is done; later accesses find the instance attribute,
+    so instances carry no lock state.
     """
     def __init__(self, fget):
         self.fget = fget
+        self.locks = {}
+        self.lock = Lock()
 
     def __get__(self, instance, owner):
         if instance is None:
             return self
-        value = self.fget(instance)
-        setattr(instance, self.fget.__name__, value)
-        return value
+        name, values, key = self.fget.__name__, vars(instance), id(instance)
+        with self.lock:
+            lock, users = self.locks.get(key, (None, 0))
+            self.locks[key] = lock or RLock(), users + 1
+            lock = self.locks[key][0]
+        try:
+            with lock:
+                if name not in values:
+                    setattr(instance, name, self.fget(instance))
+                return values[name]
+        finally:
+            with self.lock:
+                users = self.locks[key][1] - 1
+                if users:
+                    self.locks[key] = lock, users
+                else:
+                    del self.locks[key]
 
 class ClassAttr(object):
     """
@@ -60,6 +139,9 @@ class MultiDict(dict):
     def __setitem__(self, key, value):
         super().__setitem__(key, self[key] + (value,))
 
+    def __reduce__(self):
+        return type(self), ([(key, value) for key, values in self.items() for value in values],)
+
 class AttrDict(MultiDict):
     """
     A dict built from an iterator, with an attribute shortcut
@@ -82,10 +164,12 @@ class LazyDict(dict):
     """
     A dict built on demand from an iterator
     Duplicate keys are disallowed
+    A lock serializes advancing the iterator; present keys need no lock.
     """
     def __init__(self, iterable):
         super().__init__()
         self.iterator = iter(iterable)
+        self.lock = Lock()
 
     def __getitem__(self, item):
         if item in self:
@@ -93,13 +177,16 @@ class LazyDict(dict):
         raise KeyError(item)
 
     def __contains__(self, item):
-        while not super().__contains__(item):
-            try:
-                (key, value) = next(self.iterator)
-            except StopIteration:
-                return False
-            assert not super().__contains__(key), "Duplicate key"
-            self[key] = value
+        if super().__contains__(item):
+            return True
+        with self.lock:
+            while not super().__contains__(item):
+                try:
+                    (key, value) = next(self.iterator)
+                except StopIteration:
+                    return False
+                assert not super().__contains__(key), "Duplicate key"
+                self[key] = value
         return True
 
     def get(self, item):
@@ -170,10 +257,70 @@ def keywords(bases):
         except AttributeError:
             pass
 
+VARIANTS = WeakValueDictionary()
+VARIANTLOCK = RLock()
+
+def variant(cls, kwargs):
+    """
+    Key for memoized variants, or None if keyword values are unhashable
+    Types are included so that equal values of different types stay distinct.
+    Bound methods (such as Elf.fetch) are not memoized,
+    because the key would keep their instance alive.
+    """
+    if any(isinstance(value, MethodType) for value in kwargs.values()):
+        return None
+    key = cls, tuple(sorted((name, type(value), value) for name, value in kwargs.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def derive(base, kwargs):
+    """ Keyword variant of base, used to unpickle variants """
+    return base(**kwargs)
+
+def locate(module, qualname, steps=0):
+    """
+    Class found by name, then followed back through steps variant bases
+    A class declared within a Struct is named by the variant which replaces it.
+    """
+    cls = import_module(module)
+    for name in qualname.split('.'):
+        cls = getattr(cls, name)
+    for _ in range(steps):
+        cls = vars(cls)['__variant__'][0]
+    return cls
+
+def reduce(cls):
+    """
+    Pickle keyword variants as base class and keywords, and others by name
+    """
+    if '__variant__' in vars(cls):
+        return derive, vars(cls)['__variant__']
+    try:
+        found, steps = locate(cls.__module__, cls.__qualname__), 0
+        while found is not cls:
+            found, steps = vars(found)['__variant__'][0], steps + 1
+    except (AttributeError, ImportError, KeyError) as error:
+        raise PicklingError(f"Can't pickle {cls!r}: not found by name") from error
+    if not steps:
+        return cls.__qualname__
+    return locate, (cls.__module__, cls.__qualname__, steps)
+
 class Meta(type):
     """
     metaclass for classes which derive variants via keyword values
+    Variants are memoized, so equal keywords produce the same class,
+    even when derived concurrently.
+    Variants pickle as their base class and keywords.
+    Variants with bound method keywords (such as Elf.fetch) are not memoized,
+    since a key holding the method would keep its instance alive (see variant).
     """
+    def __init_subclass__(mcs, **kwargs):
+        super().__init_subclass__(**kwargs)
+        copyreg.pickle(mcs, reduce)
+
     __namespace__ = NameSpace
     __member__ = tuple
     @classmethod
@@ -192,10 +339,24 @@ class Meta(type):
         super().__init__(name, bases, namespace)
 
     def __call__(cls, *args, **kwargs):
-        namespace = cls.__namespace__(**kwargs)
-        if namespace is not cls.__namespace__:
-            cls = type(cls)(cls.__name__, (cls,), namespace, **kwargs)
+        if not kwargs:
+            return super().__call__(*args) if args else cls
+        key = variant(cls, kwargs)
+        derived = VARIANTS.get(key) if key else None
+        if derived is None:
+            with VARIANTLOCK:
+                derived = VARIANTS.get(key) if key else None
+                if derived is None:
+                    derived, namespace = cls, cls.__namespace__(**kwargs)
+                    if namespace is not cls.__namespace__:
+                        derived = type(cls)(cls.__name__, (cls,), namespace, **kwargs)
+                        derived.__variant__ = cls, kwargs
+                    if key:
+                        VARIANTS[key] = derived
+        cls = derived
         return super().__call__(*args) if args else cls
 
     def __getattr__(cls, name):
         return cls.__namespace__.__getattr__(name)
+
+copyreg.pickle(Meta, reduce)
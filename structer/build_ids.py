@@ -8,8 +8,9 @@ The names can differ because of symbolic links.
 
 from argparse import ArgumentParser
 
-from . import memmap
 from .elf import Core, Elf
+from .pool import Pool
+from .seekable import seekable
 
 def main():
     """ Fetch Build IDs in ELF core """
@@ -18,15 +19,17 @@ def main():
     parser.add_argument("--prefix", type=str, default='')
     parser.add_argument("file")
     args = parser.parse_args()
-    core = Core(memmap(args.file), args.file)
+    core = Core(seekable(args.file), args.file)
     linkmap = {linkmap.addr: linkmap.name for linkmap in core.linkmap}
-    for addr, elf in core.elves():
-        name, build_id = elf.name, elf.build_id()
-        if args.list:
-            print(f"{addr:016x} {build_id} {name} ({linkmap.get(addr)})")
-        else:
-            try:
-                elf_id = Elf(memmap(args.prefix + name), name).build_id()
-                assert  elf_id == build_id, f"{name}: {elf_id} != {build_id}"
-            except (AssertionError, FileNotFoundError) as exc:
-                print(build_id, exc)
+    with Pool() as pool:
+        for addr, elf in core.elves():
+            name, build_id = elf.name, elf.build_id()
+            if args.list:
+                print(f"{addr:016x} {build_id} {name} ({linkmap.get(addr)})")
+            else:
+                try:
+                    with pool.open(args.prefix + name) as mem:
+                        elf_id = Elf(mem, name).build_id()
+                    assert  elf_id == build_id, f"{name}: {elf_id} != {build_id}"
+                except (AssertionError, FileNotFoundError) as exc:
+                    print(build_id, exc)
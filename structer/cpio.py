@@ -3,11 +3,13 @@ Access to cpio archive representation via function
 Modules for various archive formats can provide a function with a common name.
 """
 
+from array import array
+from struct import Struct
 from stat import S_IFDIR, S_IFREG, S_IFLNK, S_IFIFO, S_IFCHR, S_IFBLK, S_IFSOCK, S_IFMT
 
 from . import CacheAttr
 from .data import Bytes, Int, MTime, Pad, Tail, pad, PString
-from .named import VarStruct
+from .named import VarStruct, Tuple, load
 from .enum import Enum
 
 Number = Int(base=16, length=8)
@@ -50,6 +52,12 @@ class Cpio(VarStruct):
         """ Slice payload to exclude subsequent content """
         return self.tail[:self.filesize]
 
+    def __reduce__(self):
+        """ Pickle this member and its contents, without subsequent members """
+        mem, start = self.__source__
+        end = start + len(self) - len(self.tail) + self.filesize
+        return load, (type(self), bytes(mem[start:end]))
+
     def __iter__(self):
         align = type(self).pad.align
         while len(self.tail) > 0:
@@ -58,6 +66,156 @@ class Cpio(VarStruct):
             self = type(self)(self.tail, size + pad(size, align))
         assert str(self.name) == 'TRAILER!!!', "Truncated archive"
 
+def normalize(name):
+    """ Archive member name without leading ./ or / """
+    return name[2:] if name.startswith('./') else name.lstrip('/')
+
+HEADER = Struct('6s' + 13*'8s')
+
+class Fields(Tuple):
+    """ Numeric header fields used without a Cpio object """
+    mode, inode, nlink, major, minor, filesize
+
+def fields(mem, offset):
+    """
+    Member name, data offset, and Fields, parsed directly from the header at offset
+    The name and its padding must be present in mem.
+    """
+    raw = HEADER.unpack_from(mem, offset)
+    if raw[0] not in (b'070701', b'070702'):
+        raise ValueError(f"Bad cpio magic at offset {offset}")
+    values = Fields(*(int(raw[index], 16) for index in (2, 1, 5, 8, 9, 7)))
+    namesize = int(raw[12], 16)
+    start = offset + HEADER.size
+    data = start + namesize
+    return str(mem[start:data - 1], 'utf-8'), data + pad(data, Cpio.pad.align), values
+
+class Member(Tuple):
+    """ Archive member from a stream, with contents copied out of the stream """
+    name, fields, contents
+
+def stream(chunks):
+    """
+    Generator of Member tuples from an iterable of archive pieces
+    Only the current member is buffered, so memory is bounded by member size.
+    """
+    chunks, buf, pos = iter(chunks), bytearray(), 0
+    align = Cpio.pad.align
+    def need(size):
+        while len(buf) < size:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise EOFError("Truncated archive")
+            buf.extend(chunk)
+    while True:
+        if pos > len(buf) // 2:
+            del buf[:pos]
+            pos = 0
+        need(pos + HEADER.size)
+        need(pos + HEADER.size + int(HEADER.unpack_from(buf, pos)[12], 16))
+        name, data, values = fields(buf, pos)
+        if name == 'TRAILER!!!':
+            return
+        size = values.filesize
+        pos = data + size + pad(size, align)
+        need(pos)
+        yield Member(name, values, memoryview(bytes(buf[data:data + size])))
+
+class Index(object):
+    """
+    Archive member index, built in one pass without member objects
+    Names map to ordinals, which index compact arrays of header offset,
+    data offset, file size, mode, inode, link count, and device numbers.
+    Lookup by name ignores any leading ./ or /
+    """
+    def __init__(self, mem):
+        self.mem = mem
+        self.names = []
+        self.offset, self.data, self.filesize, self.mode = (array('Q') for _ in range(4))
+        self.inode, self.nlink, self.major, self.minor = (array('Q') for _ in range(4))
+        align = Cpio.pad.align
+        offset = 0
+        while True:
+            name, data, (mode, inode, nlink, major, minor, filesize) = fields(mem, offset)
+            if name == 'TRAILER!!!':
+                break
+            self.names.append(name)
+            self.offset.append(offset)
+            self.data.append(data)
+            self.filesize.append(filesize)
+            self.mode.append(mode)
+            self.inode.append(inode)
+            self.nlink.append(nlink)
+            self.major.append(major)
+            self.minor.append(minor)
+            offset = data + filesize + pad(filesize, align)
+
+    @CacheAttr
+    def ordinal(self):
+        """ Ordinal of each normalized name """
+        return {normalize(name): index for index, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return normalize(name) in self.ordinal
+
+    def __getitem__(self, name):
+        """ Cpio member with specified name, instantiated on demand """
+        return Cpio(self.mem, self.offset[self.ordinal[normalize(name)]])
+
+    def contents(self, name):
+        """ Data of member with specified name, without instantiating it """
+        index = self.ordinal[normalize(name)]
+        return self.mem[self.data[index]:][:self.filesize[index]]
+
+    def filetype(self, name):
+        """ FileType of member with specified name """
+        return FileType(S_IFMT(self.mode[self.ordinal[normalize(name)]]))
+
+    def select(self, *filetypes):
+        """ Generator of names of members with any of the specified file types """
+        modes = set(int(filetype) for filetype in filetypes)
+        for name, mode in zip(self.names, self.mode):
+            if S_IFMT(mode) in modes:
+                yield name
+
+    def inodes(self, *filetypes):
+        """
+        Generator of (ordinal, names) once per inode, for the specified file types
+        names includes every hard link; ordinal is the one carrying the data,
+        which newc puts last. A group is yielded once all its links are seen,
+        and groups with links missing from the archive are yielded at the end.
+        """
+        modes = set(int(filetype) for filetype in filetypes)
+        groups = {}
+        for index, mode in enumerate(self.mode):
+            if modes and S_IFMT(mode) not in modes:
+                continue
+            if self.nlink[index] < 2:
+                yield index, (self.names[index],)
+                continue
+            key = self.inode[index], self.major[index], self.minor[index]
+            group = groups.setdefault(key, [])
+            group.append(index)
+            if len(group) == self.nlink[index]:
+                yield self.linked(groups.pop(key))
+        for group in groups.values():
+            yield self.linked(group)
+
+    def linked(self, group):
+        """ Data carrying ordinal and all names of a hard link group """
+        ordinal = max(group, key=lambda index: (self.filesize[index], index))
+        return ordinal, tuple(self.names[index] for index in group)
+
 def archive(mem):
     """ Instantiate Cpio on specified memoryview """
     return Cpio(mem)
+
+def index(mem):
+    """ Instantiate Index on specified memoryview """
+    return Index(mem)
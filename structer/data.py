@@ -6,10 +6,14 @@ Int and Long use different keywords (length and wordsize).
 Int subclasses are independent of elf.enums.WordSize
 """
 
-import re
+from array import array
+from calendar import timegm
+from collections import OrderedDict
 from datetime import datetime
+from itertools import accumulate, chain
+from threading import Lock
 
-from . import Meta, ClassAttr
+from . import Meta, ClassAttr, CacheAttr
 
 class Data(metaclass=Meta, length=0):
     """
@@ -20,6 +24,11 @@ class Data(metaclass=Meta, length=0):
     def __struct_format__(self):
         return f'{self.__namespace__.length}s'
 
+    @classmethod
+    def __encode__(cls, value):
+        """ Value for struct.pack which the constructor turns back into value """
+        return value
+
     __getattr__ = Meta.__getattr__
 
 class Bytes(bytes, Data):
@@ -37,10 +46,13 @@ class String(Bytes):
     """
     Bytes subclass for null terminated strings
     """
-    pattern = re.compile(b'^[^\0]*')
+    @CacheAttr
+    def text(self):
+        """ Decoded string before the first null """
+        return self.split(b'\0', 1)[0].decode()
 
     def __str__(self):
-        return self.pattern.match(self).group().decode()
+        return str(self.text)
 
 class Nulls(Bytes):
     """
@@ -49,12 +61,18 @@ class Nulls(Bytes):
     def __new__(cls, bites):
         assert bites == b'\0'* cls.length
 
+    @classmethod
+    def __encode__(cls, value):
+        return b''
+
 def signer(cls, char):
     """
     Use upper case for unsigned format character
     """
     return char if cls.signed else char.upper()
 
+DIGITS = {2: 'b', 8: 'o', 10: 'd', 16: 'x'}
+
 class Int(int, Data, signed=False, base=None):
     """
     int data element with 1, 2, 4, or 8 bytes, defaulting to 1
@@ -67,6 +85,12 @@ class Int(int, Data, signed=False, base=None):
             return super().__new__(cls, value)
         return super().__new__(cls, value, base=cls.base)
 
+    @classmethod
+    def __encode__(cls, value):
+        if cls.base is None:
+            return int(value)
+        return format(int(value), DIGITS[cls.base]).rjust(cls.length, '0').encode()
+
     @ClassAttr
     def __struct_format__(self):
         length = self.length
@@ -121,34 +145,98 @@ class Pad(Bytes, align=1):
         assert padding == len(padding) * b'\0'
         return padding
 
-class Strings(Bytes):
+class Table(object):
     """
-    Contiguous range of null terminated strings
+    Contiguous range of null terminated strings, with lazily built indexes
+    Strings are found by ordinal, or by byte offset as in ELF string tables.
+    count, if nonzero, limits the table to that many strings.
+    Strings looked up singly are memoized, up to cache of them;
+    decode produces them all in bulk, and iteration uses that.
+    len is the byte length, as for other callable elements.
     """
-    class Iter(object):
+    def __init__(self, mem, offset=0, count=0, cache=1024):
+        self.mem = mem[offset:]
+        self.count = count
+        self.limit = cache
+        self.memo = OrderedDict()
+        self.lock = Lock()
+
+    @CacheAttr
+    def raw(self):
         """
-        Iterate over null terminated strings
+        bytes copy of the table
+        With count, only the span through the last counted null is copied,
+        found in chunks which double in size.
         """
-        pattern = re.compile(b'([^\0]*)\0')
+        if not self.count:
+            return bytes(self.mem)
+        pieces, needed, start, size = [], self.count, 0, 1 << 12
+        while needed and start < len(self.mem):
+            piece = bytes(self.mem[start:start + size])
+            nulls = piece.count(b'\0')
+            if nulls >= needed:
+                end = -1
+                for _ in range(needed):
+                    end = piece.index(b'\0', end + 1)
+                piece, nulls = piece[:end + 1], needed
+            pieces.append(piece)
+            needed -= nulls
+            start, size = start + size, size * 2
+        return b''.join(pieces)
+
+    @CacheAttr
+    def parts(self):
+        """ Terminated strings as bytes, omitting any unterminated remainder """
+        parts = self.raw.split(b'\0')
+        parts.pop()
+        return parts
+
+    @CacheAttr
+    def offsets(self):
+        """ Byte offset of each string, by ordinal """
+        return array('L', accumulate(chain((0,), (len(part) + 1 for part in self.parts))))[:-1]
 
-        def __init__(self, mem, offset, count):
-            self.mem = mem[offset:]
-            self.count = count
+    @CacheAttr
+    def strings(self):
+        """ Every terminated string, decoded in one pass """
+        raw = self.raw
+        return raw[:raw.rfind(b'\0') + 1].decode().split('\0')[:-1]
 
-        def __iter__(self):
-            count = self.count
-            for match in self.pattern.finditer(self.mem):
-                yield match.group(1).decode()
-                if count:
-                    count -= 1
-                    if not count:
-                        break
+    def decode(self):
+        """ list of every string """
+        return list(self.strings)
 
-        def __len__(self):
-            return len(self.mem)
+    def at(self, offset):
+        """ String starting at specified byte offset, which may be within another string """
+        with self.lock:
+            if offset in self.memo:
+                self.memo.move_to_end(offset)
+                return self.memo[offset]
+        raw = self.raw
+        text = raw[offset:raw.index(b'\0', offset)].decode()
+        with self.lock:
+            self.memo[offset] = text
+            if len(self.memo) > self.limit:
+                self.memo.popitem(last=False)
+        return text
 
+    def __getitem__(self, ordinal):
+        if 'strings' in vars(self):
+            return self.strings[ordinal]
+        return self.at(self.offsets[ordinal])
+
+    def __iter__(self):
+        return iter(self.strings)
+
+    def __len__(self):
+        return len(self.mem)
+
+class Strings(Bytes):
+    """
+    Contiguous range of null terminated strings
+    """
     def __call__(self, mem, offset, count=0):
-        return self.Iter(mem, offset, count)
+        return Table(mem, offset, count)
 
 class MTime(Int):
     """
@@ -157,6 +245,10 @@ class MTime(Int):
     def __new__(cls, value):
         return datetime.utcfromtimestamp(int(super().__new__(cls, value)))
 
+    @classmethod
+    def __encode__(cls, value):
+        return super().__encode__(timegm(value.timetuple()))
+
 class Tail(Bytes):
     """
     The remaining space in this slice
@@ -0,0 +1,140 @@
+"""
+Index of local debug files keyed by build ID
+Roots are walked for ELF files, whose build IDs are read from notes alone,
+except within .build-id trees, where xx/yyyy.debug names give the build ID.
+Directories are rescanned only when their mtime changes,
+and candidates are verified by build ID before they are returned.
+.gnu_debuglink targets are found next to the linking file, in its .debug
+subdirectory, or under each root.
+"""
+
+import os
+import struct
+from os.path import abspath, basename, dirname, join
+from threading import Lock
+
+from . import memmap, named
+from .elf import Elf, ElfError
+
+class Dir(named.Tuple):
+    """ Scanned directory: mtime, subdirectories, and (build ID, path) pairs """
+    mtime, subdirs, found
+
+def build_id(name):
+    """ Build ID of named ELF file as a hex string, or None """
+    try:
+        return str(Elf(memmap(name), name).build_id())
+    except (ElfError, OSError, KeyError, ValueError, struct.error):
+        return None
+
+def linked(name):
+    """ Build ID encoded in a .build-id/xx/yyyy.debug path, or None """
+    folder = dirname(name)
+    if basename(dirname(folder)) != '.build-id' or not name.endswith('.debug'):
+        return None
+    digits = basename(folder) + basename(name)[:-len('.debug')]
+    try:
+        bytes.fromhex(digits)
+    except ValueError:
+        return None
+    return digits.lower()
+
+class Resolver(object):
+    """
+    Build ID to debug file path, across the specified roots
+    scan is called on first use; call it again to pick up changes.
+    Verified paths are remembered with their inode and mtime.
+    The resolver is guarded by a lock, so it can be shared by threads.
+    """
+    def __init__(self, *roots):
+        self.roots = tuple(abspath(root) for root in roots)
+        self.index = {}
+        self.dirs = {}
+        self.verified = {}
+        self.lock = Lock()
+
+    def scan(self):
+        """ Rescan directories which are new or whose mtime changed, returning their count """
+        with self.lock:
+            stack, seen, count = list(self.roots), set(), 0
+            while stack:
+                path = stack.pop()
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(path)
+                known = self.dirs.get(path)
+                if known is None or known.mtime != mtime:
+                    if known is not None:
+                        self.forget(known)
+                    known = self.dirs[path] = self.read(path, mtime)
+                    count += 1
+                stack.extend(known.subdirs)
+            for path in set(self.dirs) - seen:
+                self.forget(self.dirs.pop(path))
+            return count
+
+    def read(self, path, mtime):
+        """ Dir for path, adding its files to the index """
+        subdirs, found = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                key = linked(entry.path)
+                if key is None and entry.is_file(follow_symlinks=False):
+                    key = build_id(entry.path)
+                if key is not None:
+                    found.append((key, entry.path))
+                    self.index.setdefault(key, entry.path)
+        return Dir(mtime, tuple(subdirs), tuple(found))
+
+    def forget(self, known):
+        """ Remove index entries of a directory about to be rescanned or gone """
+        for key, path in known.found:
+            if self.index.get(key) == path:
+                del self.index[key]
+
+    def verify(self, path, key):
+        """ Test that path is an ELF file with specified build ID """
+        try:
+            info = os.stat(path)
+        except OSError:
+            return False
+        stamp = info.st_dev, info.st_ino, info.st_mtime_ns
+        cached = self.verified.get(path)
+        if cached is None or cached[0] != stamp:
+            cached = self.verified[path] = stamp, build_id(path)
+        return cached[1] == key
+
+    def resolve(self, key, name=None):
+        """
+        Path of debug file with specified build ID (hex string or bytes), or None
+        If name is specified, its .gnu_debuglink is followed when the index has no match.
+        """
+        key = key.hex() if isinstance(key, (bytes, bytearray)) else str(key).lower()
+        if not self.dirs:
+            self.scan()
+        path = self.index.get(key)
+        if path is not None and self.verify(path, key):
+            return path
+        return None if name is None else self.debuglink(name, key)
+
+    def debuglink(self, name, key=None):
+        """ Debug file named by .gnu_debuglink of the named file, verified by build ID """
+        try:
+            elf = Elf(memmap(name), name)
+            link = bytes(elf.section('.gnu_debuglink'))
+            key = key or str(elf.build_id())
+        except (ElfError, OSError, KeyError, ValueError, struct.error):
+            return None
+        target = link.split(b'\0', 1)[0].decode()
+        folder = dirname(abspath(name))
+        candidates = [join(folder, target), join(folder, '.debug', target)]
+        candidates.extend(join(root, folder.lstrip('/'), target) for root in self.roots)
+        for path in candidates:
+            if path != abspath(name) and self.verify(path, key):
+                return path
+        return None
@@ -4,15 +4,23 @@ Extensible Link Format represented by named.Struct subclasses
 
 import re
 import struct
+from os import stat
+from pickle import PicklingError
+from threading import Lock
 from .. import CacheAttr, MultiDict, AttrDict, LazyDict
+from .. import advise, extents, MADV_RANDOM, MADV_WILLNEED, MADV_DONTNEED
 from ..named import StructArray, VarStructArray
 from ..intervals import Seg, Intervals
-from ..data import Bytes
+from ..data import Bytes, Long, Table
+from ..seekable import seekable
 from . import header
-from .enums import PType, SType, Type
-from . import dtags
+from .enums import PType, SType, Type, SHF_COMPRESSED
+from . import compressed, dtags, prstatus
+from .modules import Modules
 from .notes import GNU, CORE
 
+WINDOW = 1 << 24
+
 class ElfError(Exception):
     """ Handle header unpack exceptions """
 
@@ -20,6 +28,10 @@ def elftype(head):
     """ Choose class from header type field """
     return {Type.Core : Core}.get(head.type, Elf)
 
+def reopen(name):
+    """ Elf mapped from named file, used to unpickle """
+    return Elf(seekable(name), name)
+
 def segdict(mem, segtype):
     """ Group segments and sections by type """
     return AttrDict((seg.type, seg) for seg in StructArray(mem, segtype))
@@ -27,27 +39,51 @@ def segdict(mem, segtype):
 class Elf(object):
     """
     Extensible Link Format
+    prefetch enables madvise hints while scanning with find, which only cores use.
     """
+    prefetch = False
+
     def __new__(cls, mem, name=None):
         try:
-            head = header.Header(mem)
+            head = header.Header(mem[:header.SIZE])
         except (struct.error, ValueError) as exc:
             raise ElfError(exc)
         elf = super().__new__(elftype(head))
+        elf.lock = Lock()
         elf.mem, elf.name, elf.header = mem, name, head
         elf.kwargs = {**head.kwargs, **dict(fetch=elf.fetch)}
         return elf
 
+    def __reduce__(self):
+        """ Pickle by file name, so records and variants bound to fetch can be pickled """
+        if self.name is None:
+            raise PicklingError("Elf without a file name cannot be pickled")
+        return reopen, (self.name,)
+
+    def slice(self, offset, size):
+        """
+        memoryview of file contents at specified offset
+        Slicing once allows mem to be a seekable.Seekable.
+        """
+        return self.mem[offset:offset + size]
+
     def __getattr__(self, name):
-        cls = getattr(header, name)(**self.kwargs)
-        setattr(self, name, cls)
+        """
+        Header class variant bound to this Elf, derived once under its lock
+        Variants with fetch in their keywords are not memoized, so threads must not race.
+        """
+        with self.lock:
+            cls = vars(self).get(name)
+            if cls is None:
+                cls = getattr(header, name)(**self.kwargs)
+                setattr(self, name, cls)
         return cls
 
     @CacheAttr
     def segs(self):
         """ Sequence of program segment headers """
         head = self.header
-        return segdict(self.mem[head.phoff:][:head.phnum * head.phentsize], self.Phdr)
+        return segdict(self.slice(head.phoff, head.phnum * head.phentsize), self.Phdr)
 
     @CacheAttr
     def loadsegs(self):
@@ -58,7 +94,55 @@ class Elf(object):
     def sects(self):
         """ Sequence of section headers """
         head = self.header
-        return segdict(self.mem[head.shoff:][:head.shnum * head.shentsize], self.Shdr)
+        return segdict(self.slice(head.shoff, head.shnum * head.shentsize), self.Shdr)
+
+    @CacheAttr
+    def sections(self):
+        """ Section headers keyed by name, from the section header string table """
+        head = self.header
+        shdrs = StructArray(self.slice(head.shoff, head.shnum * head.shentsize), self.Shdr)
+        if not len(shdrs):
+            return {}
+        strtab = shdrs[head.shstrndx]
+        names = Table(self.slice(strtab.offset, strtab.filesz))
+        return {names.at(shdr.name): shdr for shdr in shdrs}
+
+    def section(self, shdr, size=None):
+        """
+        memoryview of section contents, decompressed if SHF_COMPRESSED
+        shdr can be a section name. Entire sections are decompressed once, into a shared cache;
+        with size specified, only that prefix is decompressed, and it is not cached.
+        SHT_NOBITS sections occupy no file space, and read as zeros.
+        """
+        if isinstance(shdr, str):
+            shdr = self.sections[shdr]
+        if shdr.type == SType.Nobits:
+            return memoryview(bytes(shdr.filesz if size is None else min(size, shdr.filesz)))
+        mem = self.slice(shdr.offset, shdr.filesz)
+        if not shdr.flags & SHF_COMPRESSED:
+            return mem if size is None else mem[:size]
+        chdr = self.Chdr(mem)
+        mem = mem[len(chdr):]
+        if size is None:
+            return compressed.contents(chdr.type, mem, chdr.size, (self.identity, shdr.offset))
+        return memoryview(compressed.prefix(chdr.type, mem, min(size, chdr.size)))
+
+    @CacheAttr
+    def identity(self):
+        """
+        Key of this Elf in the shared cache of decompressed sections
+        A named file is identified by device, inode, modification time, and the length
+        of mem, so Elf objects over the same file share sections. Otherwise, or if the file
+        cannot be examined, a token which, unlike id(self), cannot be reused while cached.
+        """
+        if self.name is not None:
+            try:
+                info = stat(self.name)
+            except OSError:
+                pass
+            else:
+                return info.st_dev, info.st_ino, info.st_mtime_ns, len(self.mem)
+        return object()
 
     @CacheAttr
     def addrindex(self):
@@ -66,8 +150,76 @@ class Elf(object):
         return Intervals(Seg(seg.vaddr, seg.offset, seg.filesz)
                          for seg in self.segs[PType.Load])
 
+    @CacheAttr
+    def extents(self):
+        """
+        Data extents of the file, as Intervals keyed by file offset, or None
+        Holes are known only for a named file mapped whole.
+        """
+        found = extents(self.mem, self.name)
+        if found is None:
+            return None
+        return Intervals(Seg(start, start, end - start) for start, end in found)
+
+    @CacheAttr
+    def dtag(self):
+        """ Enum for dynamic tag values """
+        return getattr(dtags, str(self.header.machine), dtags.DTag)(**self.kwargs)
+
+    @CacheAttr
+    def dynamic(self):
+        """
+        Dynamic section values keyed by tag, from PT_DYNAMIC by file offset
+        Tags are plain Long values, so tags missing from dtag do not stop parsing.
+        Entries after the first Null tag are ignored.
+        """
+        dynamic = MultiDict(())
+        for seg in self.segs[PType.Dynamic][:1]:
+            dyn = self.Dyn(tag=Long(**self.header.kwargs))
+            for entry in StructArray(self.slice(seg.offset, seg.filesz), dyn):
+                if entry.tag == dtags.DTag.Null:
+                    break
+                dynamic[entry.tag] = entry.val
+        return dynamic
+
+    @CacheAttr
+    def dynstr(self):
+        """
+        Table of dynamic strings, at the file offset of StrTab
+        The address is translated by the load segments, without fetch.
+        """
+        (addr,), (size,) = self.dynamic[dtags.DTag.StrTab], self.dynamic[dtags.DTag.StrSz]
+        seg = self.addrindex[addr]
+        return Table(self.slice(seg.start + addr - seg.addr, size))
+
+    def strings(self, tag):
+        """ Dynamic strings for values of the specified tag, in order """
+        return tuple(self.dynstr.at(value) for value in self.dynamic[tag])
+
+    @CacheAttr
+    def needed(self):
+        """ Names of needed libraries """
+        return self.strings(dtags.DTag.Needed)
+
+    @CacheAttr
+    def soname(self):
+        """ Shared object name, or None """
+        return next(iter(self.strings(dtags.DTag.SoName)), None)
+
+    @CacheAttr
+    def runpath(self):
+        """ Library search directories, from RunPath or else Rpath """
+        paths = self.strings(dtags.DTag.RunPath) or self.strings(dtags.DTag.Rpath)
+        return tuple(path for value in paths for path in value.split(':') if path)
+
     def fetch(self, addr, size=0):
-        """ memoryview slice at specified address """
+        """
+        memoryview slice at specified address
+        addr can be a range of addresses, which may span segments,
+        but must not include unmapped addresses.
+        """
+        if isinstance(addr, range):
+            return self.fetchrange(addr)
         seg = self.addrindex[addr]
         offset = addr - seg.addr
         length = seg.length - offset
@@ -78,13 +230,37 @@ class Elf(object):
         if offset + size > len(self.mem):
             assert offset + size <= self.addrindex.end
             raise ElfError("truncated file")
-        return self.mem[offset:][:size]
+        return self.slice(offset, size)
+
+    def fetchrange(self, addrs):
+        """ memoryview of a range of addresses, joining the segments it spans """
+        pieces, addr = [], addrs.start
+        for seg in self.addrindex.intersect(addrs.start, addrs.stop):
+            if seg.addr > addr:
+                raise KeyError(addr)
+            end = seg.addr + seg.length
+            if end > addr:
+                offset = seg.start + addr - seg.addr
+                if offset + end - addr > len(self.mem):
+                    raise ElfError("truncated file")
+                pieces.append(self.slice(offset, end - addr))
+                addr = end
+        if addr < addrs.stop:
+            raise KeyError(addr)
+        return pieces[0] if len(pieces) == 1 else memoryview(b''.join(pieces))
 
     def notes(self, segs):
-        """ elements within segments of type Note """
+        """
+        elements within segments of type Note
+        Notes whose owner or type is unknown (as from a newer kernel) are skipped.
+        """
         for seg in segs:
-            for note in VarStructArray(self.mem[seg.offset:][:seg.filesz], self.Note):
-                yield note()
+            for note in VarStructArray(self.slice(seg.offset, seg.filesz), self.Note):
+                try:
+                    element = note()
+                except (AttributeError, ValueError):
+                    continue
+                yield element
 
     @CacheAttr
     def note(self):
@@ -100,28 +276,102 @@ class Elf(object):
         mem, = self.note[GNU.Build_ID]
         return Bytes(mem)
 
-    def find(self, pattern):
-        """ Generator for re search on seg contents """
-        for seg in self.addrindex:
-            for hit in pattern.finditer(self.mem[seg.start:][:seg.length]):
-                yield seg.addr + hit.start()
+    def windows(self, span=None, addrs=None):
+        """
+        Pieces of load segments as (addr, offset, length, overlap) tuples
+        With span specified, segments are split into WINDOW sized pieces,
+        and overlap is how far a match can extend beyond the piece;
+        otherwise, a match can extend to the end of the segment.
+        addrs, if specified, is a range of addresses which pieces are clipped to,
+        found via the index; overlap can still extend beyond the range.
+        Where segments overlap, each address is in one piece, from the segment starting last.
+        """
+        lo, hi = (0, None) if addrs is None else (addrs.start, addrs.stop)
+        for seg, low, high in self.addrindex.visible(lo, hi):
+            step = WINDOW if span is not None else high - low
+            for pos in range(low - seg.addr, high - seg.addr, step):
+                length = min(step, high - seg.addr - pos)
+                overlap = seg.length - pos - length
+                if span is not None:
+                    overlap = min(span, overlap)
+                yield seg.addr + pos, seg.start + pos, length, overlap
+
+    def find(self, pattern, span=None, addrs=None):
+        """
+        Generator for re search on seg contents
+        span, if specified, bounds the match length beyond its first byte,
+        which allows segments to be searched in windows.
+        addrs, if specified, is a range of addresses where matches may start,
+        though they may extend beyond it. Overlapping segments are searched once per address.
+        For cores, the next window is prefetched, and each window is released once searched.
+        With span specified, holes in a sparse file are skipped unless the pattern
+        matches null bytes. The generator returns the number of bytes skipped,
+        as the value of StopIteration (or of yield from).
+        """
+        present = None
+        if span is not None and pattern.search(bytes(span + 1)) is None:
+            present = self.extents
+        skipped = 0
+        pieces = self.windows(span, addrs)
+        piece = next(pieces, None)
+        while piece:
+            addr, offset, length, overlap = piece
+            piece = next(pieces, None)
+            if piece and self.prefetch:
+                advise(self.mem, MADV_WILLNEED, piece[1], min(piece[2], WINDOW))
+            end = offset + length + overlap
+            ranges = self.data(present, span, offset, length)
+            skipped += length - sum(stop - start for start, stop in ranges)
+            for start, stop in ranges:
+                limit = end if span is None else min(stop + span, end)
+                for hit in pattern.finditer(self.slice(start, limit - start)):
+                    if hit.start() >= stop - start:
+                        break
+                    yield addr + start - offset + hit.start()
+            if self.prefetch:
+                advise(self.mem, MADV_DONTNEED, offset, length)
+        return skipped
+
+    @staticmethod
+    def data(present, span, offset, length):
+        """
+        List of [start, stop) offsets within a window where a match can start
+        A match can start within span bytes before data, since it must reach the data.
+        The bytes in between are skipped.
+        """
+        if present is None:
+            return [(offset, offset + length)]
+        ranges = []
+        for seg in present.intersect(offset, offset + length + span):
+            low, high = max(offset, seg.addr - span), min(seg.addr + seg.length, offset + length)
+            if low >= high:
+                continue
+            if ranges and low <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], high)
+            else:
+                ranges.append([low, high])
+        return ranges
 
-    def findbytes(self, bites):
+    def findbytes(self, bites, addrs=None):
         """ Generator to locate specified bytes """
-        return self.find(re.compile(re.escape(bites)))
+        return self.find(re.compile(re.escape(bites)), len(bites) - 1, addrs)
 
-    def findwords(self, *words, fmt="Q"):
+    def findwords(self, *words, fmt="Q", addrs=None):
         """ Generator to locate specified word sequence """
-        return self.find(re.compile(b''.join(re.escape(struct.pack(fmt, word)) for word in words)))
+        bites = b''.join(struct.pack(fmt, word) for word in words)
+        return self.find(re.compile(re.escape(bites)), len(bites) - 1, addrs)
 
 class Core(Elf):
     """
     ELF crash dump
     """
+    prefetch = True
+
     def __new__(cls, mem, name=None):
         """ Validate type field """
         elf = super().__new__(cls, mem, name)
         assert elftype(elf.header) is cls, "Not a core"
+        advise(mem, MADV_RANDOM)
         return elf
 
     def size(self):
@@ -141,9 +391,20 @@ class Core(Elf):
         return AttrDict(StructArray(auxv, self.Auxv))
 
     @CacheAttr
-    def dtag(self):
-        """ Enum for dynamic tag values """
-        return getattr(dtags, str(self.header.machine), dtags.DTag)(**self.kwargs)
+    def threads(self):
+        """
+        Columns of PRStatus fields over all threads, from one pass over the notes
+        Register layouts are in the prstatus module, keyed by machine name.
+        Note types are compared before conversion, so types unknown to CORE are passed over.
+        """
+        head = self.header
+        regs = getattr(prstatus, str(head.machine), None)
+        if not (isinstance(regs, type) and issubclass(regs, prstatus.Regs)):
+            raise ElfError(f"No PRStatus layout for {head.machine}")
+        payloads = (note.payload for seg in self.segs[PType.Note]
+                    for note in VarStructArray(self.slice(seg.offset, seg.filesz), self.Note)
+                    if str(note.name) == 'CORE' and note.notetype == int(CORE.PRStatus))
+        return prstatus.threads(payloads, regs, head.wordsize, head.byteorder)
 
     def elves(self):
         """ Iterate over readonly executable filenote Elf headers """
@@ -151,9 +412,50 @@ class Core(Elf):
             if mapping.offset == 0:
                 seg = self.loadsegs[mapping.start]
                 if seg.filesz > 0 and seg.flags == 5:
-                    head = self.mem[seg.offset:][:seg.filesz]
+                    head = self.slice(seg.offset, seg.filesz)
                     yield seg.vaddr, Elf(head, mapping.name)
 
+    @CacheAttr
+    def modules(self):
+        """
+        Index of mapped modules, for resolving addresses
+        Load bias comes from the link map, matched by the address of each dynamic section,
+        or else from the lowest load segment in the module's lowest mapping,
+        which also provides the build ID. Unlike elves, any mapping at offset zero counts.
+        A mapping whose first segment is absent (KeyError, as from a partial core)
+        or is not a readable ELF header (such as locale-archive) is skipped.
+        """
+        filenote, bias, build_ids, seen = self.filenote, {}, {}, set()
+        for mapping in filenote:
+            seg = self.loadsegs[mapping.start] if mapping.start in self.loadsegs else None
+            if mapping.offset != 0 or mapping.name in seen or seg is None or seg.filesz == 0:
+                continue
+            seen.add(mapping.name)
+            try:
+                head = self.slice(seg.offset, seg.filesz)
+                if bytes(head[:4]) != b'\177ELF':
+                    continue
+                addr, elf = seg.vaddr, Elf(head, mapping.name)
+                loads = elf.segs[PType.Load]
+            except (KeyError, ElfError, ValueError, struct.error):
+                continue
+            try:
+                build_ids[elf.name] = elf.build_id()
+            except ValueError:
+                pass
+            vaddr = min((seg.vaddr for seg in loads), default=None)
+            if vaddr is not None:
+                bias[elf.name] = addr - (vaddr - vaddr % filenote.align)
+        modules = Modules(filenote, filenote.align)
+        try:
+            for entry in self.linkmap:
+                ordinal = modules.ordinal(entry.dyn)
+                if ordinal >= 0:
+                    bias[modules.names[ordinal]] = entry.addr
+        except (KeyError, ValueError, ElfError):
+            pass
+        return Modules(filenote, filenote.align, bias, build_ids)
+
     @CacheAttr
     def linkmap(self):
         """ Return chain of loaded objects from dynamic section Debug element """
@@ -0,0 +1,77 @@
+"""
+Contents of SHF_COMPRESSED sections, decompressed on demand
+Entire sections are kept in a least recently used cache shared by all Elf objects,
+keyed by file identity (or a token for anonymous buffers) and section offset,
+and bounded by total decompressed size.
+Prefixes are decompressed incrementally, without inflating the rest of the section.
+The zstd codec is optional.
+"""
+
+import zlib
+from collections import OrderedDict
+from threading import Lock
+
+from .enums import Compress
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK = 1 << 14
+
+class Cache(object):
+    """
+    Least recently used values, bounded by their total length
+    The most recent value is kept even if it exceeds the bound by itself.
+    Values are loaded without holding the lock, so a key may be loaded twice.
+    """
+    def __init__(self, size=1 << 28):
+        self.size, self.used = size, 0
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key, load):
+        """ Cached value for key, calling load if absent """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        value = load()
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = value
+                self.used += len(value)
+            while self.used > self.size and len(self.entries) > 1:
+                self.used -= len(self.entries.popitem(last=False)[1])
+        return value
+
+CACHE = Cache()
+
+def decompressor(chtype):
+    """ Object with decompress method for specified Compress value """
+    if chtype == Compress.Zlib:
+        return zlib.decompressobj()
+    if zstandard is None:
+        raise ValueError("zstd compressed section requires zstandard")
+    return zstandard.ZstdDecompressor().decompressobj()
+
+def prefix(chtype, mem, size):
+    """ bytes of the first size bytes of the decompressed section """
+    out, unpack, offset = bytearray(), decompressor(chtype), 0
+    while len(out) < size and offset < len(mem):
+        out += unpack.decompress(mem[offset:offset + CHUNK])
+        offset += CHUNK
+    return bytes(out[:size])
+
+def contents(chtype, mem, size, key):
+    """
+    memoryview of the decompressed section, from the shared cache
+    key identifies the section without reading it, as hashing it would on every access.
+    """
+    def load():
+        data = prefix(chtype, mem, size)
+        if len(data) != size:
+            raise ValueError(f"Compressed section expanded to {len(data)} bytes, not {size}")
+        return memoryview(data)
+    return CACHE.get((key, chtype, size), load)
@@ -64,7 +64,7 @@ class Machine(Enum, Int(length=1)):
 class PType(Enum, Int(length=2)):
     """ ELF segment type """
     Null, Load, Dynamic, Interp, Note, ShLib, Phdr, Tls, Num = range(0, 9)
-    GNU_EH_Frame, GNU_Stack, GNU_Relro = range(0x6474e550, 0x6474e553)
+    GNU_EH_Frame, GNU_Stack, GNU_Relro, GNU_Property = range(0x6474e550, 0x6474e554)
     PAX_Flags = 0x65041580
 
 class SType(Enum, Int(length=2)):
@@ -75,6 +75,12 @@ class SType(Enum, Int(length=2)):
     GNUAttributes, GNUHash, GNULiblist, GNUChecksum = range(0x6ffffff5, 0x6ffffff9)
     GNUverdef, GNUverneed, GNUversym = range(0x6ffffffd, 0x70000000)
 
+SHF_COMPRESSED = 0x800
+
+class Compress(Enum, Int(length=2)):
+    """ Compression type in Elf_Chdr of SHF_COMPRESSED sections """
+    Zlib, Zstd = 1, 2
+
 class Note(Enum, Int(length=2)):
     """ Elf note base class """
     def __eq__(self, other):
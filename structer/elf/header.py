@@ -42,6 +42,9 @@ class Header(Ident):
     def __new__(cls, mem, offset=0):
         return super().__new__(cls(**Ident(mem).kwargs), mem, offset)
 
+# Size of the 64 bit header, the largest, whatever the native word size
+SIZE = Header(wordsize=2).__size__
+
 class Phdr(object):
     """
     ELF program segment header
@@ -71,6 +74,25 @@ class Shdr(Struct):
     link, info, = 2*(Int2,)
     align, entsize = 2*(Long, )
 
+class Chdr(object):
+    """
+    ELF compression header, at the start of SHF_COMPRESSED sections
+    """
+    class Chdr32(Struct):
+        """ 32 bit compression header """
+        type = enums.Compress
+        size, addralign = 2*(Int2,)
+
+    class Chdr64(Struct):
+        """ 64 bit compression header """
+        type = enums.Compress
+        reserved = Int2
+        size, addralign = 2*(Int3,)
+
+    def __new__(cls, **kwargs):
+        """ Choose the class indexed by the wordsize """
+        return (None, cls.Chdr32, cls.Chdr64)[kwargs['wordsize']](**kwargs)
+
 class Note(VarStruct):
     """
     Elf Note
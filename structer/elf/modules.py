@@ -0,0 +1,81 @@
+"""
+Index of modules mapped in a core, for resolving addresses
+The file note provides address ranges and file offsets,
+the link map provides load bias, and each module's first page its build ID.
+"""
+
+from array import array
+from bisect import bisect
+
+from .. import named
+
+class Location(named.Tuple):
+    """
+    Symbolization input for one address
+    offset is relative to the load bias, so it is a link time address,
+    and fileoffset is the offset within the mapped file.
+    """
+    addr, name, build_id, offset, fileoffset
+
+class Modules(object):
+    """
+    File mappings sorted by start address, as compact arrays
+    Each mapping has the ordinal of its module, which indexes
+    the module names, load biases, and build IDs.
+    A module without a known bias uses the start of its lowest mapping.
+    """
+    def __init__(self, mappings, page, bias=None, build_ids=None):
+        self.names, ordinal = [], {}
+        self.start, self.end, self.offset, self.module = (array('Q') for _ in range(4))
+        for name, start, end, offset in sorted(mappings, key=lambda mapping: mapping[1]):
+            if name not in ordinal:
+                ordinal[name] = len(self.names)
+                self.names.append(name)
+            self.start.append(start)
+            self.end.append(end)
+            self.offset.append(offset * page)
+            self.module.append(ordinal[name])
+        base = {}
+        for start, module in zip(self.start, self.module):
+            base.setdefault(self.names[module], start)
+        bias, build_ids = bias or {}, build_ids or {}
+        self.bias = array('Q', (bias.get(name, base[name]) for name in self.names))
+        self.build_ids = [build_ids.get(name) for name in self.names]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def index(self, addr):
+        """ Index of the mapping containing addr, or -1 """
+        index = bisect(self.start, addr) - 1
+        if index < 0 or addr >= self.end[index]:
+            return -1
+        return index
+
+    def ordinal(self, addr):
+        """ Ordinal of the module containing addr, or -1 """
+        index = self.index(addr)
+        return -1 if index < 0 else self.module[index]
+
+    def __getitem__(self, addr):
+        location, = self.resolve((addr,))
+        if location is None:
+            raise KeyError(addr)
+        return location
+
+    def resolve(self, addrs):
+        """ Generator of a Location per address, or None if it is not in any mapping """
+        start, end, offset, modules = self.start, self.end, self.offset, self.module
+        names, bias, build_ids = self.names, self.bias, self.build_ids
+        new = tuple.__new__
+        for addr in addrs:
+            index = bisect(start, addr) - 1
+            if index < 0 or addr >= end[index]:
+                yield None
+                continue
+            module = modules[index]
+            yield new(Location, (addr, names[module], build_ids[module],
+                                 addr - bias[module], addr - start[index] + offset[index]))
@@ -4,7 +4,7 @@ from .enums import Note
 
 class GNU(Note):
     """ ELF note type """
-    ABI_Tag, HWCap, Build_ID, Gold_Version = range(1, 5)
+    ABI_Tag, HWCap, Build_ID, Gold_Version, Property_Type_0 = range(1, 6)
 
 class CORE(Note):
     """ ELF core note type """
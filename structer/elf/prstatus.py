@@ -0,0 +1,81 @@
+"""
+Columnar decoding of PRStatus notes, over all threads at once
+General register layouts are keyed by enums.Machine name.
+Each layout lists elf_gregset_t in order, as words.
+"""
+
+from array import array
+from sys import byteorder as native
+
+from .. import named
+from .enums import ByteOrder
+
+def typecode(codes, size):
+    """ array typecode with specified item size """
+    return next(code for code in codes if array(code).itemsize == size)
+
+class Regs(object):
+    """ General register names, and which of them are pc and sp """
+    names, pc, sp = (), None, None
+
+class X86_64(Regs):
+    """ user_regs_struct """
+    names = ('r15', 'r14', 'r13', 'r12', 'rbp', 'rbx', 'r11', 'r10', 'r9', 'r8',
+             'rax', 'rcx', 'rdx', 'rsi', 'rdi', 'orig_rax', 'rip', 'cs', 'eflags',
+             'rsp', 'ss', 'fs_base', 'gs_base', 'ds', 'es', 'fs', 'gs')
+    pc, sp = 'rip', 'rsp'
+
+class AArch64(Regs):
+    """ user_pt_regs """
+    names = tuple(f'x{index}' for index in range(31)) + ('sp', 'pc', 'pstate')
+    pc, sp = 'pc', 'sp'
+
+class PPC64(Regs):
+    """ pt_regs, padded to ELF_NGREG """
+    names = tuple(f'r{index}' for index in range(32)) + (
+        'nip', 'msr', 'orig_gpr3', 'ctr', 'link', 'xer', 'ccr', 'softe',
+        'trap', 'dar', 'dsisr', 'result') + tuple(f'pad{index}' for index in range(4))
+    pc, sp = 'nip', 'r1'
+
+class S390(Regs):
+    """ s390_regs, with the 32 bit access registers paired into words """
+    names = ('psw_mask', 'psw_addr') + tuple(f'r{index}' for index in range(16)) + tuple(
+        f'acr{index}_{index + 1}' for index in range(0, 16, 2)) + ('orig_gpr2',)
+    pc, sp = 'psw_addr', 'r15'
+
+class Threads(named.Tuple):
+    """
+    PRStatus fields, as arrays with one element per thread, in note order
+    signal is the current signal, and sigpend and sighold are signal masks.
+    regs is a memoryview indexed by thread and register, with register names in names.
+    """
+    pid, ppid, pgrp, sid, signal, sigpend, sighold, pc, sp, regs, names
+
+def threads(payloads, regs, wordsize, byteorder):
+    """
+    Threads decoded from PRStatus payloads in one pass
+    Fields are copied into arrays without creating an object per value.
+    The layout is elf_prstatus with words of the specified size:
+    siginfo and cursig, two signal masks, four ids, four timevals, then registers.
+    """
+    width = 2 << wordsize
+    word = typecode('BHILQ', width)
+    signal, ids = array(typecode('bhilq', 2)), array(typecode('bhilq', 4))
+    masks, words = array(word), array(word)
+    count = len(regs.names)
+    start = 32 + 10 * width
+    for payload in payloads:
+        assert len(payload) >= start + count * width, "Truncated PRStatus note"
+        signal.frombytes(payload[12:14])
+        masks.frombytes(payload[16:16 + 2 * width])
+        ids.frombytes(payload[16 + 2 * width:32 + 2 * width])
+        words.frombytes(payload[start:start + count * width])
+    if (byteorder == ByteOrder.lsb) != (native == 'little'):
+        for column in (signal, masks, ids, words):
+            column.byteswap()
+    pc, sp = regs.names.index(regs.pc), regs.names.index(regs.sp)
+    view = memoryview(words)
+    if signal:
+        view = view.cast('B').cast(word, (len(signal), count))
+    return Threads(ids[0::4], ids[1::4], ids[2::4], ids[3::4], signal, masks[0::2], masks[1::2],
+                   words[pc::count], words[sp::count], view, regs.names)
@@ -0,0 +1,192 @@
+"""
+Core read in one pass from a binary stream, such as a core_pattern pipe
+The kernel writes the ELF header, program headers, and notes before the load segments,
+so file mappings, the auxiliary vector, and threads are available first.
+Headers, notes, and selected load segments are spilled at their own offsets
+into a sparse file, which a single mmap presents to Core; nothing else is kept.
+"""
+
+from array import array
+from bisect import bisect
+from collections import deque
+from mmap import mmap
+from tempfile import TemporaryFile
+
+from ..named import StructArray
+from . import Core, ElfError, header
+from .enums import PType
+from .modules import Modules
+
+CHUNK = 1 << 16
+
+class Partial(object):
+    """
+    Slices of a spill mapping, restricted to the spans written so far
+    A slice must lie within a written span, so unwritten data raises KeyError
+    rather than reading as zeros.
+    """
+    def __init__(self, mem):
+        self.mem = mem
+        self.starts, self.ends = array('Q'), array('Q')
+
+    def add(self, start, end):
+        """ Record [start, end) as written; spans are added in offset order """
+        if self.ends and self.ends[-1] == start:
+            self.ends[-1] = end
+        else:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def __len__(self):
+        return len(self.mem)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("slice step must be 1")
+            if stop <= start:
+                return self.mem[start:start]
+        else:
+            start = range(len(self))[key]
+            stop = start + 1
+        index = bisect(self.starts, start) - 1
+        if index < 0 or start >= self.ends[index]:
+            raise KeyError(start)
+        if stop > self.ends[index]:
+            raise KeyError(self.ends[index])
+        view = self.mem[start:stop]
+        return view if isinstance(key, slice) else view[0]
+
+def select(stream, seg):
+    """ Default choice of load segments to spill: within a file mapping, or small """
+    return seg.filesz <= stream.small or stream.mapped(seg.vaddr)
+
+class Stream(object):
+    """
+    Core read in one pass from a binary stream
+    core is ready once the notes are read, and load segments are added as they arrive.
+    select(stream, phdr) chooses load segments to spill; by default those within
+    file mappings, which hold module ELF headers and link map data, and those
+    no larger than small bytes. limit bounds the total bytes of spilled load segments.
+    Memory use is bounded by CHUNK; spilled data is in the spill file (temporary if None).
+    close (or exiting the stream as a context manager) closes the spill file and its mapping.
+    """
+    def __init__(self, file, spill=None, select=select, small=1 << 16, limit=1 << 30):
+        self.file, self.offset = file, 0
+        self.select, self.small, self.limit = select, small, limit
+        self.spilled = self.skipped = 0
+        prefix = self.read(header.SIZE)
+        try:
+            head = header.Header(prefix)
+        except ValueError as exc:
+            raise ElfError(exc)
+        prefix += self.read(head.phoff + head.phnum * head.phentsize - len(prefix))
+        phdrs = StructArray(memoryview(prefix)[head.phoff:], header.Phdr(**head.kwargs))
+        size = max([len(prefix)] + [seg.offset + seg.filesz for seg in phdrs])
+        self.spill = TemporaryFile() if spill is None else open(spill, 'w+b')
+        self.spill.truncate(size)
+        self.mapping = mmap(self.spill.fileno(), size)
+        self.mapping[:len(prefix)] = prefix
+        self.partial = Partial(memoryview(self.mapping))
+        self.partial.add(0, len(prefix))
+        self.pending = deque(sorted((seg for seg in phdrs if seg.filesz > 0 and
+                                     seg.type in (PType.Note, PType.Load)),
+                                    key=lambda seg: seg.offset))
+        self.core = Core(self.partial, spill)
+        while self.pending and self.pending[0].type == PType.Note:
+            seg = self.pending.popleft()
+            self.copy(seg.offset, seg.filesz, True)
+        try:
+            filenote = self.core.filenote
+            self.mappings = Modules(filenote, filenote.align)
+        except (KeyError, ValueError):
+            self.mappings = None
+
+    def read(self, size):
+        """ Exactly size bytes from the stream """
+        pieces = []
+        while size > 0:
+            piece = self.file.read(min(size, CHUNK))
+            if not piece:
+                raise EOFError("Truncated core")
+            pieces.append(piece)
+            size -= len(piece)
+            self.offset += len(piece)
+        return b''.join(pieces)
+
+    def copy(self, offset, size, keep):
+        """ Pass size bytes at offset, spilling them if keep is true """
+        if offset < self.offset:
+            raise ElfError(f"Segment at {offset} overlaps data already read")
+        while self.offset < offset:
+            self.read(min(offset - self.offset, CHUNK))
+        end = offset + size
+        while self.offset < end:
+            start = self.offset
+            piece = self.read(min(end - start, CHUNK))
+            if keep:
+                self.mapping[start:start + len(piece)] = piece
+        if keep:
+            self.partial.add(offset, end)
+
+    def mapped(self, addr):
+        """ Test whether addr is within a file mapping of the file note """
+        return self.mappings is not None and self.mappings.index(addr) >= 0
+
+    def wanted(self, seg):
+        """ Test whether a load segment is selected and fits within limit """
+        if not self.select(self, seg):
+            return False
+        if self.spilled + seg.filesz > self.limit:
+            self.skipped += seg.filesz
+            return False
+        self.spilled += seg.filesz
+        return True
+
+    def __iter__(self):
+        """ Generator of load segments as they are passed, spilled or not """
+        while self.pending:
+            seg = self.pending.popleft()
+            self.copy(seg.offset, seg.filesz, seg.type != PType.Load or self.wanted(seg))
+            if seg.type == PType.Load:
+                yield seg
+
+    def run(self, until=None, early=False):
+        """
+        Read load segments until until(core) is true, or the stream ends
+        With early, stop after the last selected segment within a file mapping,
+        which is as far as module headers and link map data extend, without reading
+        the rest; a pipe writer then sees the pipe closed. Small segments selected beyond it
+        (such as [vsyscall], at the end of the file) do not delay the exit.
+        Otherwise, remaining input is read and discarded.
+        Return True if the stream was read to its end. run can be called again to resume.
+        """
+        last = max((seg.offset for seg in self.pending if seg.type == PType.Load and
+                    self.mapped(seg.vaddr) and self.select(self, seg)), default=-1)
+        if early and last < 0:
+            return False
+        for seg in self:
+            if until is not None and until(self.core) or early and seg.offset >= last:
+                return False
+        while self.file.read(CHUNK):
+            pass
+        return True
+
+    def close(self):
+        """
+        Close the spill file and release the core's view of its mapping
+        Views taken from the core keep the mapping until they are released.
+        """
+        self.partial.mem.release()
+        try:
+            self.mapping.close()
+        except BufferError:
+            pass
+        self.spill.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
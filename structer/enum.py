@@ -8,10 +8,11 @@ class EnumDict(NameSpace):
     """
     MetaEnum namespace with mapping for member names
     A member is any non-descriptor attribute not present in object.
-    Skipping descriptors allows methods to be defined in Enum subclasses.
+    Skipping descriptors allows methods to be defined in Enum subclasses,
+    and skipping __classcell__ allows those methods to use super().
     """
     def __setitem__(self, key, value):
-        if hasattr(object, key) or hasattr(value, '__get__'):
+        if hasattr(object, key) or hasattr(value, '__get__') or key == '__classcell__':
             super().__setitem__(key, value)
         else:
             if key in self.__member__.__mapping__:
@@ -80,3 +81,16 @@ class Enum(metaclass=MetaEnum):
 
     def __repr__(self):
         return '.'.join((type(self).__name__, str(self)))
+
+    def __reduce__(self):
+        return getattr, (type(self), self.__name__)
+
+    @classmethod
+    def __encode__(cls, value):
+        """ Encoded value of a member, given the member, its name, or its value """
+        if isinstance(value, str) and not isinstance(value, cls):
+            try:
+                value = cls.__namespace__.__member__.__mapping__[value]
+            except KeyError:
+                raise ValueError("%r is not a %s name" % (value, cls.__name__)) from None
+        return super().__encode__(cls(value))
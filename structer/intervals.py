@@ -2,8 +2,10 @@
 Space efficient index for binary search
 """
 
-from bisect import bisect
-from struct import pack
+from array import array
+from bisect import bisect, bisect_left
+from itertools import islice
+from operator import add, itemgetter
 
 from . import named, CacheAttr
 
@@ -13,24 +15,45 @@ class Seg(named.Tuple):
     """
     addr, start, length
 
-def combine(segs):
-    """ Combine adjacent segs which have no intervening gaps """
-    segs = sorted(segs)
-    for index in range(len(segs), 1, -1):
-        low, high = segs[index-2:index]
-        if high.addr - low.addr == low.length and low.start + low.length == high.start:
-            segs[index-2:index] = [Seg(low.addr, low.start, low.length + high.length)]
+def ordered(segs):
+    """
+    List of segs sorted by address
+    Input already sorted by address is checked in one pass, and not sorted again.
+    """
+    segs = list(segs)
+    if any(high[0] < low[0] for low, high in zip(segs, islice(segs, 1, None))):
+        segs.sort(key=itemgetter(0))
     return segs
 
+def combine(segs):
+    """ Combine adjacent segs which have no intervening gaps, in one pass """
+    combined = []
+    for seg in ordered(segs):
+        if combined:
+            low = combined[-1]
+            if seg.addr - low.addr == low.length and low.start + low.length == seg.start:
+                combined[-1] = Seg(low.addr, low.start, low.length + seg.length)
+                continue
+        combined.append(seg)
+    return combined
+
 class Intervals(object):
     """
     Space efficient index for binary search, sorted by address
     The segs attribute has multiple (packed) values rather than individual values.
+    Adjacent segs are combined while the packed columns are appended, in one pass.
+    Segs may overlap; a point within several is found in the one starting last.
     """
     def __init__(self, segs, fmt="Q"):
-        segs = combine(segs)
-        fmts = f'{len(segs)}{fmt}'
-        self.segs = Seg(*(memoryview(pack(fmts, *seg)).cast(fmt) for seg in zip(*segs)))
+        addrs, starts, lengths = (array(fmt) for _ in range(3))
+        for addr, start, length in ordered(segs):
+            if addrs and addr - addrs[-1] == lengths[-1] and starts[-1] + lengths[-1] == start:
+                lengths[-1] += length
+                continue
+            addrs.append(addr)
+            starts.append(start)
+            lengths.append(length)
+        self.segs = Seg(*(memoryview(column) for column in (addrs, starts, lengths)))
 
     def seg(self, index):
         """ Return Seg at specified index, from packed values """
@@ -41,8 +64,77 @@ class Intervals(object):
         """
         Offset just beyond the last element
         Do not assume offsets are sorted; the address is the sort key.
+        Computed from the packed columns, without a Seg per element.
+        """
+        return max(map(add, self.segs.start, self.segs.length), default=0)
+
+    @CacheAttr
+    def reach(self):
+        """
+        Highest end address of the segs under each node of an implicit binary tree
+        Node i has children 2i and 2i + 1, and leaves follow the internal nodes in seg order,
+        so a search skips every subtree whose segs all end too early.
         """
-        return max(seg.start + seg.length for seg in self)
+        level = list(map(add, self.segs.addr, self.segs.length))
+        level += [0] * ((1 << max(len(level) - 1, 0).bit_length()) - len(level))
+        levels = [level]
+        while len(level) > 1:
+            level = list(map(max, level[::2], level[1::2]))
+            levels.append(level)
+        return array(self.segs.addr.format, [0] + [end for level in levels[::-1] for end in level])
+
+    def indices(self, lo, hi=None):
+        """
+        Generator of indices of segs intersecting [lo, hi), in descending order
+        O((k + 1) log n) for k results, however widely segs overlap.
+        hi of None is unbounded.
+        """
+        reach = self.reach
+        leaves = len(reach) // 2
+        count = len(self.segs.addr) if hi is None else bisect_left(self.segs.addr, hi)
+        nodes = [(1, 0, leaves)]
+        while nodes:
+            node, first, width = nodes.pop()
+            if first >= count or reach[node] <= lo:
+                continue
+            if width == 1:
+                yield first
+                continue
+            width //= 2
+            nodes.append((2 * node, first, width))
+            nodes.append((2 * node + 1, first + width, width))
+
+    def visible(self, lo=0, hi=None):
+        """
+        List of (seg, low, high) in address order, where [low, high) is a range
+        of addresses within [lo, hi) and seg, which no seg starting later covers
+        A point within several segs is thus listed once, as lookups find it.
+        """
+        found = []
+        for index in self.indices(lo, hi):
+            seg = self.seg(index)
+            low, end = max(lo, seg.addr), seg.addr + seg.length
+            if hi is not None:
+                end = min(end, hi)
+            later = sorted(self.seg(other) for other in self.indices(low, end)
+                           if other > index and self.segs.length[other])
+            for cover in later + [Seg(end, 0, 0)]:
+                if cover.addr > low:
+                    found.append((seg, low, min(cover.addr, end)))
+                low = max(low, cover.addr + cover.length)
+                if low >= end:
+                    break
+        found.sort(key=itemgetter(1))
+        return found
+
+    def intersect(self, lo, hi):
+        """ Segs clipped to the address range [lo, hi), in address order """
+        found = []
+        for index in self.indices(lo, hi):
+            addr, start, length = self.seg(index)
+            low, high = max(lo, addr), min(hi, addr + length)
+            found.append(Seg(low, start + low - addr, high - low))
+        return found[::-1]
 
     def __getitem__(self, key):
         index = bisect(self.segs.addr, key) - 1
@@ -50,7 +142,10 @@ class Intervals(object):
             raise KeyError
         seg = self.seg(index)
         if key - seg.addr > seg.length:
-            raise KeyError
+            index = next(self.indices(key, key + 1), None)
+            if index is None:
+                raise KeyError
+            seg = self.seg(index)
         return seg
 
     def __contains__(self, key):
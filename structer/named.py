@@ -48,6 +48,10 @@ class Tuple(tuple, metaclass=MetaTuple):
     def __repr__(self):
         return f"{self.__class__.__name__}{super().__repr__()}"
 
+def load(cls, raw):
+    """ Instance parsed from raw bytes, used to unpickle """
+    return cls(memoryview(raw))
+
 class StructDict(NameSpace):
     """
     MetaStruct namespace
@@ -86,7 +90,7 @@ class MetaStruct(Meta):
     __member__ = NameList
 
     def __len__(cls):
-        return cls.__struct__.size
+        return cls.__size__
 
     def __init__(cls, name, bases, namespace, **kwargs):
         if namespace.member and not namespace.__member__:
@@ -96,6 +100,7 @@ class MetaStruct(Meta):
             init.__struct_format__ for init in namespace.__member__)
         cls.__len__ = type(cls).__len__
         cls.__struct__ = struct.Struct(struct_format)
+        cls.__size__ = cls.__struct__.size
         cls.__struct_format__ = f'{len(cls)}s'
         for key, value in namespace.__member__.__mapping__.items():
             setattr(cls, key, StructAttr(value))
@@ -114,43 +119,141 @@ class Struct(tuple, metaclass=MetaStruct, byteorder=0, member=None):
         item = cls.member(item)
         return item(mem, offset + len(cls)) if callable(item) else item
 
+    @classmethod
+    def __encode__(cls, value):
+        """ Raw bytes of a nested Struct """
+        return bytes(value)
+
+    def __bytes__(self):
+        """ Raw bytes, packed from the encoded element values """
+        members = type(self).__namespace__.__member__
+        return self.__struct__.pack(*(init.__encode__(item) for init, item in zip(members, self)))
+
+    def __reduce__(self):
+        return load, (type(self), bytes(self))
+
+    @classmethod
+    def view(cls, mem, offset=0):
+        """ Writable View of this layout at offset within mem """
+        return View(cls, mem, offset)
+
     __getattr__ = Meta.__getattr__
 
+def fields(cls):
+    """
+    (struct.Struct, offset) for each element of a Struct class, computed once per class
+    Offsets allow for native alignment, matching the packed layout.
+    """
+    found = vars(cls).get('__fields__')
+    if found is None:
+        prefix = cls.__prefix__
+        formats = [init.__struct_format__ for init in cls.__namespace__.__member__]
+        found = []
+        for index, fmt in enumerate(formats):
+            single = struct.Struct(prefix + fmt)
+            end = struct.calcsize(prefix + ''.join(formats[:index + 1]))
+            found.append((single, end - single.size))
+        found = cls.__fields__ = tuple(found)
+    return found
+
+class View(object):
+    """
+    Struct layout bound to a writable buffer (bytearray, writable mmap) at an offset
+    Each field access unpacks just that field, so later changes to the buffer are seen.
+    Each assignment encodes the value with the element's __encode__,
+    then packs just its bytes in place, with the byte order and word size of the class.
+    Packing precedes the write, because pack_into clears the field before a failed pack.
+    Fields which are themselves Struct layouts are returned as nested views.
+    Only the fixed layout is covered, so variable length parts of a VarStruct are not.
+    """
+    __slots__ = ('__type__', '__mem__', '__offset__')
+
+    def __init__(self, cls, mem, offset=0):
+        if cls.member is not None:
+            raise TypeError(f"{cls.__name__} chooses its layout from its contents")
+        mem = memoryview(mem)
+        if mem.readonly:
+            raise TypeError("View requires a writable buffer")
+        if offset < 0 or offset + len(cls) > mem.nbytes:
+            raise ValueError(f"{cls.__name__} at {offset} exceeds {mem.nbytes} bytes")
+        object.__setattr__(self, '__type__', cls)
+        object.__setattr__(self, '__mem__', mem)
+        object.__setattr__(self, '__offset__', offset)
+
+    def __field__(self, name):
+        """ Element initializer, struct, and absolute offset of named field """
+        cls = self.__type__
+        try:
+            index = cls.__namespace__.__member__.__mapping__[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        packer, offset = fields(cls)[index]
+        return cls.__namespace__.__member__[index], packer, self.__offset__ + offset
+
+    def __getattr__(self, name):
+        init, packer, offset = self.__field__(name)
+        if isinstance(init, MetaStruct) and init.member is None:
+            return init.view(self.__mem__, offset)
+        value, = packer.unpack_from(self.__mem__, offset)
+        return init(value)
+
+    def __setattr__(self, name, value):
+        init, packer, offset = self.__field__(name)
+        self.__mem__[offset:offset + packer.size] = packer.pack(init.__encode__(value))
+
+    def __len__(self):
+        return len(self.__type__)
+
+    def __bytes__(self):
+        return bytes(self.__mem__[self.__offset__:self.__offset__ + len(self)])
+
+    def __load__(self):
+        """ Struct parsed from the current contents """
+        return self.__type__(self.__mem__, self.__offset__)
+
+    def __repr__(self):
+        return f"{self.__type__.__name__}.view(@{self.__offset__})"
+
 class VarStruct(Struct):
     """
     Struct with callable elements of variable size
+    The size of each instance is the fixed prefix size plus the variable lengths,
+    computed arithmetically since elements of variable size are bytes-like.
     """
     @classmethod
     def __new_iter__(cls, mem, offset):
         """ Use tuple.__iter__ to allow custom __iter__ method """
         return tuple.__iter__(super().__new__(cls, mem, offset))
     @classmethod
-    def __init_format__(cls):
-        return cls.__struct_format__
+    def __init_size__(cls):
+        return cls.__size__
     def __new__(cls, mem, offset=0):
         iterable = cls.__new_iter__(mem, offset)
-        struct_format = cls.__init_format__()
+        start = offset
         items = []
-        offset += struct.Struct(struct_format).size
+        offset += cls.__init_size__()
         for item in iterable:
             if callable(item):
                 item = item(mem, offset)
-                length = len(item)
-                offset += length
-                struct_format += f'{length}s'
+                offset += len(item)
             items.append(item)
         new = tuple.__new__(cls, items)
-        new.__struct__ = struct.Struct(struct_format)
-        new.__struct_format__ = f'{new.__struct__.size}s'
+        new.__size__ = offset - start
+        new.__source__ = mem, start
         return new
 
+    def __bytes__(self):
+        """ Raw bytes of the span this instance was parsed from """
+        mem, start = self.__source__
+        return bytes(mem[start:start + len(self)])
+
 class VarStructs(VarStruct):
     """
     A VarStruct with multiple VarStruct members
     """
     @classmethod
-    def __init_format__(cls):
-        return cls.__prefix__
+    def __init_size__(cls):
+        return 0
     @classmethod
     def __new_iter__(cls, mem, offset):
         return cls.__namespace__.__member__
@@ -180,6 +283,10 @@ class StructArray(object):
             return tuple(self)[index]
         return self.fetch(self.offset[index])
 
+    def view(self, index):
+        """ Writable View of the indexed element; mem must be writable """
+        return self.cls.view(self.mem, self.offset[index])
+
     def __iter__(self):
         offset = 0
         while offset < self.mem.nbytes:
@@ -0,0 +1,174 @@
+"""
+Pool of readonly file mappings, shared by file identity
+Each use of a mapping is a context manager, and the memoryview it provides
+is released on exit. Mappings which are no longer in use stay open in a
+least recently used pool, capped by count and total mapped bytes,
+so opening the same file again reuses its mapping.
+A file is identified by device, inode, size, and modification time,
+so a file which is replaced or rewritten gets a new mapping.
+"""
+
+import gc
+from collections import OrderedDict
+from mmap import mmap, PROT_READ
+from os import fstat
+from threading import Lock
+from warnings import warn
+
+from . import advise
+
+class StaleError(BufferError):
+    """ Views derived from a mapping outlive it """
+
+class Entry(object):
+    """
+    Open mapping, with the number of handles using it
+    mmap is None for empty files, which cannot be mapped.
+    """
+    def __init__(self, name, key, region):
+        self.name, self.key, self.mmap = name, key, region
+        self.size = len(region) if region is not None else 0
+        self.users = 0
+
+    def close(self):
+        """
+        Unmap, collecting garbage cycles (such as an Elf and its fetch method)
+        which may still hold slices, before reporting views which outlive the mapping
+        The pool calls this without holding its lock, as collection can take a while.
+        """
+        if self.mmap is None:
+            return
+        try:
+            self.mmap.close()
+        except BufferError:
+            gc.collect()
+            try:
+                self.mmap.close()
+            except BufferError as exc:
+                raise StaleError(f"{self.name}: views outlive the mapping") from exc
+
+class Mapping(object):
+    """
+    Context manager providing a memoryview of a pooled mapping
+    The memoryview is released on exit, so using it later raises ValueError.
+    Slices taken from it keep the mapping open until they are released;
+    closing the mapping before then raises StaleError.
+    """
+    def __init__(self, pool, entry, advice=None):
+        self.pool, self.entry, self.advice = pool, entry, advice
+        self.mem = None
+
+    def __enter__(self):
+        region = self.entry.mmap
+        self.mem = memoryview(b'' if region is None else region)
+        if self.advice is not None:
+            advise(self.mem, self.advice)
+        return self.mem
+
+    def __exit__(self, *exc):
+        self.mem.release()
+        self.pool.release(self.entry)
+
+class Pool(object):
+    """
+    Open mappings keyed by file identity
+    count and size cap the mappings kept open, and mappings in use are never closed,
+    so the caps are exceeded while more mappings than that are in use.
+    Closing the pool (or exiting it as a context manager) closes every mapping.
+    The pool is guarded by a lock, so it can be shared by threads.
+    """
+    def __init__(self, count=64, size=1 << 32):
+        self.count, self.size = count, size
+        self.entries = OrderedDict()
+        self.mapped = 0
+        self.lock = Lock()
+
+    def open(self, name, advice=None):
+        """
+        Mapping of file with specified name, reused if already open
+        advice, if specified, is an mmap.MADV_* value for the whole file.
+        """
+        with open(name, 'rb') as file:
+            info = fstat(file.fileno())
+            key = info.st_dev, info.st_ino, info.st_size, info.st_mtime_ns
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is None:
+                    region = mmap(file.fileno(), 0, access=PROT_READ) if info.st_size else None
+                    entry = self.entries[key] = Entry(name, key, region)
+                    self.mapped += entry.size
+                entry.users += 1
+                self.entries.move_to_end(key)
+                evicted = self.evict()
+        self.discard(evicted)
+        return Mapping(self, entry, advice)
+
+    def release(self, entry):
+        """ End one use of entry, closing mappings beyond the caps """
+        with self.lock:
+            entry.users -= 1
+            evicted = self.evict()
+        self.discard(evicted)
+
+    def evict(self):
+        """
+        Remove least recently used mappings not in use, while over either cap
+        Called with the lock held; the caller closes the returned entries after releasing it.
+        """
+        evicted = []
+        for entry in list(self.entries.values()):
+            if len(self.entries) <= self.count and self.mapped <= self.size:
+                break
+            if entry.users == 0:
+                evicted.append(self.drop(entry))
+        return evicted
+
+    def drop(self, entry):
+        """ Remove entry from the pool, without closing it """
+        del self.entries[entry.key]
+        self.mapped -= entry.size
+        return entry
+
+    @staticmethod
+    def discard(evicted):
+        """
+        Close evicted mappings, warning of views which outlive them
+        Their staleness is no error of the caller which caused eviction;
+        such a mapping is unmapped once its last view is released.
+        """
+        for entry in evicted:
+            try:
+                entry.close()
+            except StaleError as exc:
+                warn(str(exc), RuntimeWarning)
+
+    def close(self):
+        """ Close every mapping, raising StaleError if any is in use or has live views """
+        stale, closing = [], []
+        with self.lock:
+            for entry in list(self.entries.values()):
+                if entry.users:
+                    stale.append(StaleError(f"{entry.name}: mapping in use"))
+                closing.append(self.drop(entry))
+        for entry in closing:
+            try:
+                entry.close()
+            except StaleError as exc:
+                stale.append(exc)
+        if stale:
+            raise stale[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+POOL = Pool()
+
+def mapping(name, advice=None):
+    """ Mapping of file with specified name from the shared pool """
+    return POOL.open(name, advice)
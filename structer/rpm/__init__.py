@@ -4,9 +4,20 @@ RPM package format represented by named.Struct subclasses
 
 import lzma
 import gzip
+import zlib
+import hashlib
+from collections import deque
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED
+from queue import Queue
+from threading import Thread, Event
+from functools import partial
+from stat import S_IFMT, S_ISREG
+from struct import unpack
 from .. import LazyDict, CacheAttr, cpio
-from ..data import Int, Bytes, String, Strings, Nulls, Payload, Pad, Tail
-from ..named import Struct, VarStruct, VarStructs, StructArray
+from ..cpio import normalize
+from ..data import Int, Bytes, String, Strings, Nulls, Payload, Pad, Tail, pad
+from ..named import Struct, VarStruct, VarStructs, StructArray, Tuple
 from ..enum import Enum
 from ..elf import Elf, ElfError
 from .enums import Type, OSnum, Sig, Tag, HeaderTag, TagType
@@ -38,6 +49,15 @@ class Entries(Payload):
         super().__init__(size)
         self.size = size * len(Entry)
 
+def known(entries):
+    """ Generator of (tag name, entry), skipping entries whose tag is not an Enum value """
+    for index in range(len(entries)):
+        try:
+            entry = entries[index]
+        except ValueError:
+            continue
+        yield str(entry.tag), entry
+
 class Header(VarStruct, tag=Tag):
     """
     RPM signature and header layout
@@ -55,10 +75,12 @@ class Header(VarStruct, tag=Tag):
 
     @CacheAttr
     def entry(self):
-        """ Index header entries by tag name """
+        """
+        Index header entries by tag name
+        Entries with tag numbers missing from the tag Enum are skipped.
+        """
         entry = Entry(tag=type(self).tag, byteorder=type(self).byteorder)
-        return LazyDict((str(ent.tag), ent)
-                        for ent in StructArray(self.entries, entry))
+        return LazyDict(known(StructArray(self.entries, entry)))
 
     def __getattr__(self, name):
         entry = self.entry[name]
@@ -66,7 +88,360 @@ class Header(VarStruct, tag=Tag):
         setattr(self, name, value)
         return value
 
-class RPM(VarStructs, byteorder=2):
+    def fetch(self, *names):
+        """
+        Decode several tags with one pass over the entries
+        Entries are indexed only until each name is found, or to the end if one is absent.
+        Return a tuple in the order of names, with None for absent tags
+        """
+        entry = self.entry
+        return tuple(getattr(self, name) if name in entry else None for name in names)
+
+GHOST = 1 << 6
+
+class File(Tuple):
+    """ One element of a Manifest """
+    path, size, mode, digest, linkto
+
+class Manifest(object):
+    """
+    File paths and per-file metadata from header tags alone
+    Each column is decoded on first access, and the payload is never touched.
+    Absent tags produce columns of empty values.
+    """
+    def __init__(self, header):
+        self.header = header
+
+    def column(self, name, default):
+        """ Tag value, or a default for each file if the tag is absent """
+        try:
+            return getattr(self.header, name)
+        except KeyError:
+            return [default] * len(self)
+
+    @CacheAttr
+    def basenames(self):
+        """ Final path components """
+        try:
+            return list(self.header.basenames)
+        except KeyError:
+            return []
+
+    @CacheAttr
+    def paths(self):
+        """ Full paths, from dirnames indexed by dirindexes """
+        if not self.basenames:
+            return []
+        dirnames = list(self.header.dirnames)
+        return [dirnames[index] + base
+                for index, base in zip(self.header.dirindexes, self.basenames)]
+
+    @CacheAttr
+    def sizes(self):
+        """ File sizes, preferring 64 bit sizes if present """
+        longsizes, = self.header.fetch('longfilesizes')
+        return self.column('filesizes', 0) if longsizes is None else longsizes
+
+    @CacheAttr
+    def modes(self):
+        """ File mode bits """
+        return self.column('filemodes', 0)
+
+    @CacheAttr
+    def digests(self):
+        """ Hexadecimal file digests, empty for other than regular files """
+        return list(self.column('digests', ''))
+
+    @CacheAttr
+    def linktos(self):
+        """ Symbolic link targets, empty for other than symbolic links """
+        return list(self.column('linktos', ''))
+
+    @CacheAttr
+    def classes(self):
+        """ File classification strings, via fileclass indexes into classdict """
+        fileclass, classdict = self.header.fetch('fileclass', 'classdict')
+        if fileclass is None or classdict is None:
+            return [''] * len(self)
+        classdict = list(classdict)
+        return [classdict[index] for index in fileclass]
+
+    @CacheAttr
+    def archived(self):
+        """ Normalized paths of files which the payload carries, omitting %ghost files """
+        return set(normalize(path) for path, flags in zip(self.paths, self.column('flags', 0))
+                   if not flags & GHOST)
+
+    @CacheAttr
+    def elfpaths(self):
+        """
+        Normalized paths of files classified as ELF
+        None if the header does not classify files
+        """
+        if 'fileclass' not in self.header.entry and self:
+            return None
+        return set(normalize(path) for path, fileclass in zip(self.paths, self.classes)
+                   if fileclass.startswith('ELF'))
+
+    def __len__(self):
+        return len(self.basenames)
+
+    def __getitem__(self, index):
+        return File(self.paths[index], self.sizes[index], self.modes[index],
+                    self.digests[index], self.linktos[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def select(self, *filetypes):
+        """ Generator of paths of files with any of the specified file types """
+        modes = set(int(filetype) for filetype in filetypes)
+        for path, mode in zip(self.paths, self.modes):
+            if S_IFMT(mode) in modes:
+                yield path
+
+ALGORITHMS = {1: 'md5', 2: 'sha1', 8: 'sha256', 9: 'sha384', 10: 'sha512', 11: 'sha224'}
+
+class Mismatch(Tuple):
+    """ Failed digest check; name is None for the payload """
+    name, expected, actual
+
+class Verify(object):
+    """
+    Digest checks fed by RPM.members as it decompresses
+    The compressed payload is hashed piece by piece as it is decompressed,
+    and each member as it is extracted, so bytes are read only once.
+    Failures accumulate in mismatches rather than raising exceptions.
+    complete is set only once the whole payload has been hashed, so a consumer
+    which stops iterating early is left with an explicitly incomplete result.
+    As in rpm, the payload digest defaults to SHA256 and file digests to MD5.
+    """
+    def __init__(self, rpm):
+        payloaddigest, payloadalgo, filealgo = rpm.header.fetch(
+            'payloaddigest', 'payloaddigestalgo', 'filedigestalgo')
+        self.expected = payloaddigest and list(payloaddigest)[0]
+        payloadalgo = payloadalgo[0] if payloadalgo is not None else 8
+        self.payload = hashlib.new(ALGORITHMS[payloadalgo]) if self.expected else None
+        self.algorithm = ALGORITHMS[filealgo[0] if filealgo is not None else 1]
+        self.filedigests = rpm.filedigests
+        self.mismatches = []
+        self.checked = 0
+        self.complete = False
+
+    @property
+    def ok(self):
+        """ True if every check ran to the end of the payload without a mismatch """
+        return self.complete and not self.mismatches
+
+    def update(self, piece):
+        """ Hash a piece of the compressed payload """
+        if self.payload is not None:
+            self.payload.update(piece)
+
+    def member(self, name, fields, contents):
+        """ Check a member carrying data against its header digest """
+        expected = self.filedigests.get(normalize(name))
+        if expected and S_ISREG(fields.mode) and contents:
+            actual = hashlib.new(self.algorithm, contents).hexdigest()
+            self.checked += 1
+            if actual != expected:
+                self.mismatches.append(Mismatch(name, expected, actual))
+
+    def finish(self):
+        """ Check the payload digest once every piece has been hashed """
+        if self.payload is not None:
+            actual = self.payload.hexdigest()
+            self.checked += 1
+            if actual != self.expected:
+                self.mismatches.append(Mismatch(None, self.expected, actual))
+        self.complete = True
+
+class Package(object):
+    """
+    Payload and file access common to RPM and RPMStream
+    Subclasses provide a header attribute and a pieces method
+    which yields the compressed payload in pieces.
+    """
+    @CacheAttr
+    def archive(self):
+        """
+        Obtain archive format module from header
+        Add dict keys as necessary for alternate formats
+        """
+        return dict(cpio=cpio)[str(self.header.payloadformat)]
+
+    @CacheAttr
+    def manifest(self):
+        """ File list from the header, without decompressing the payload """
+        return Manifest(self.header)
+
+    @CacheAttr
+    def filedigests(self):
+        """ Header file digests keyed by normalized path, omitting empty digests """
+        manifest = self.manifest
+        return {normalize(path): digest
+                for path, digest in zip(manifest.paths, manifest.digests) if digest}
+
+    def chunks(self, size=1 << 16, verify=None):
+        """
+        Generator of decompressed payload pieces, decompressing size bytes at a time
+        Add dict keys as necessary for alternate formats
+        """
+        decompressor = dict(xz=lzma.LZMADecompressor,
+                            gzip=lambda: zlib.decompressobj(wbits=31))[
+                                str(self.header.payloadcompressor)]()
+        for piece in self.pieces(size):
+            if verify is not None:
+                verify.update(piece)
+            yield decompressor.decompress(piece)
+
+    def verify(self):
+        """ Verify object to pass to members or elves """
+        return Verify(self)
+
+    def members(self, verify=None):
+        """
+        Generator of archive members, decompressing the payload incrementally
+        With verify, digests are checked in the same pass.
+        """
+        chunks = self.chunks(verify=verify)
+        for member in self.archive.stream(chunks):
+            if verify is not None:
+                verify.member(*member)
+            yield member
+        if verify is not None:
+            for _ in chunks:
+                pass
+            verify.finish()
+
+    def candidates(self, digests=False, verify=None):
+        """
+        Generator of (name, names, contents) for regular members which may be ELF
+        The payload is decompressed incrementally. If the header classifies files,
+        only members classified as ELF are produced, decompression stops after
+        the last of them (%ghost files are never in the payload, so none is awaited),
+        and packages without any are not decompressed at all.
+        Each inode is produced once, and names lists all its hard links.
+        With digests, members whose header digest matches an earlier member
+        are not produced again; their names are included with the first.
+        With verify, every member is checked, so decompression runs to the end.
+        """
+        elfpaths, filedigests = self.manifest.elfpaths, self.filedigests
+        archived = self.manifest.archived
+        remaining = None if elfpaths is None or verify is not None else archived & set(elfpaths)
+        if remaining is not None and not remaining:
+            return
+        seen, groups, links = set(), {}, {}
+        if digests:
+            for path, digest in filedigests.items():
+                if path in archived:
+                    groups.setdefault(digest, []).append('./' + path)
+        for name, fields, contents in self.members(verify):
+            path = normalize(name)
+            if remaining is not None:
+                remaining.discard(path)
+            if not S_ISREG(fields.mode):
+                continue
+            names = [name]
+            if fields.nlink > 1:
+                names = links.setdefault((fields.inode, fields.major, fields.minor), [])
+                names.append(name)
+            if not contents or (elfpaths is not None and path not in elfpaths):
+                continue
+            digest = filedigests.get(path) if digests else None
+            if digest:
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                names = groups[digest]
+            yield name, tuple(names), contents
+            if remaining is not None and not remaining:
+                return
+
+    def elves(self, digests=False, verify=None):
+        """
+        Generator which yields Elf objects for candidates which parse as ELF
+        The names attribute lists all names of each inode (see candidates).
+        """
+        for name, names, contents in self.candidates(digests, verify):
+            try:
+                elf = Elf(contents, name=name)
+            except ElfError:
+                pass
+            else:
+                elf.names = names
+                yield elf
+
+    def sonames(self, digests=True, verify=None):
+        """
+        Generator of (names, soname, needed) for ELF members with a dynamic section
+        Dynamic entries and strings are read by file offset, without fetching by address.
+        soname is None for members which do not provide one.
+        """
+        for elf in self.elves(digests, verify):
+            try:
+                if not elf.dynamic:
+                    continue
+                found = elf.names, elf.soname, elf.needed
+            except (KeyError, ValueError):
+                continue
+            yield found
+
+    def build_ids(self, workers=2, depth=16, ordered=True, digests=False, verify=None):
+        """
+        Generator of (build_id, name) for every name of each ELF member
+        build_id is None for members without one.
+        Decompression and archive parsing run in their own thread,
+        feeding candidates through a queue of depth elements
+        to workers which parse them as ELF and fetch build IDs.
+        Results are in archive order unless ordered is False.
+        """
+        queue, stop = Queue(maxsize=depth), Event()
+        def produce():
+            try:
+                for candidate in self.candidates(digests, verify):
+                    queue.put(candidate)
+                    if stop.is_set():
+                        break
+            except Exception as exc: # pylint: disable=broad-except
+                queue.put(exc)
+            queue.put(None)
+        thread = Thread(target=produce, daemon=True)
+        pending = deque()
+        def finished(wait):
+            if ordered:
+                while pending and (wait or pending[0].done()):
+                    wait = False
+                    yield from pending.popleft().result()
+                return
+            if wait and pending:
+                futures.wait(pending, return_when=FIRST_COMPLETED)
+            for future in [future for future in pending if future.done()]:
+                pending.remove(future)
+                yield from future.result()
+        candidate = ()
+        with ThreadPoolExecutor(workers) as executor:
+            thread.start()
+            try:
+                while True:
+                    candidate = queue.get()
+                    if isinstance(candidate, Exception):
+                        raise candidate
+                    if candidate is None:
+                        break
+                    pending.append(executor.submit(harvest, *candidate))
+                    yield from finished(len(pending) >= depth)
+                while pending:
+                    yield from finished(True)
+            finally:
+                stop.set()
+                while candidate is not None:
+                    candidate = queue.get()
+                for future in pending:
+                    future.cancel()
+
+class RPM(VarStructs, Package, byteorder=2):
     """ RPM layout """
     lead = Lead
     signature = Header
@@ -74,24 +449,83 @@ class RPM(VarStructs, byteorder=2):
     header = Header(tag=HeaderTag)
     tail = Struct(member=Tail)
 
+    def pieces(self, size):
+        """ Generator of size byte slices of the compressed payload """
+        tail = self.tail
+        for offset in range(0, len(tail), size):
+            yield tail[offset:offset + size]
+
     @CacheAttr
-    def payload(self):
+    def contents(self):
         """
-        Obtain compression format and archive format from header
-        Return archive of memoryview of decompression result
+        Obtain compression format from header
+        Return memoryview of decompression result
         Add dict keys as necessary for alternate formats
         """
         compressor = dict(xz=lzma, gzip=gzip)[str(self.header.payloadcompressor)]
-        archive = dict(cpio=cpio)[str(self.header.payloadformat)]
-        return archive.archive(memoryview(compressor.decompress(self.tail)))
-
-    def elves(self):
-        """ Generator which yields Elf objects for regular files """
-        for member in self.payload:
-            if member.isreg():
-                try:
-                    elf = Elf(member.contents, name=member.name)
-                except ElfError:
-                    pass
-                else:
-                    yield elf
+        return memoryview(compressor.decompress(self.tail))
+
+    @CacheAttr
+    def payload(self):
+        """ Return archive of decompressed payload """
+        return self.archive.archive(self.contents)
+
+    @CacheAttr
+    def index(self):
+        """ Return member index of decompressed payload, for lookup by name """
+        return self.archive.index(self.contents)
+
+class RPMStream(Package):
+    """
+    RPM read in one pass from a binary stream, such as a pipe or socket
+    Only the lead and headers are buffered, reading no further than they extend.
+    The payload is decompressed as it is read, so members can be visited only once.
+    """
+    lead = Lead(byteorder=2)
+    signature = Header(byteorder=2)
+    header = Header(tag=HeaderTag, byteorder=2)
+
+    def __init__(self, file):
+        self.file, self.offset = file, 0
+        self.lead = self.lead(self.read(len(self.lead)))
+        self.signature = self.readheader(self.signature)
+        padding = self.read(pad(self.offset, 8))
+        assert padding == len(padding) * b'\0'
+        self.header = self.readheader(self.header)
+
+    def read(self, size):
+        """ Exactly size bytes from the stream """
+        pieces = []
+        while size > 0:
+            piece = self.file.read(size)
+            if not piece:
+                raise EOFError("Truncated RPM")
+            pieces.append(piece)
+            size -= len(piece)
+            self.offset += len(piece)
+        return memoryview(b''.join(pieces))
+
+    def readheader(self, cls):
+        """ Header read using the entry count and data size in its prefix """
+        prefix = self.read(16)
+        count, size = unpack('>II', prefix[8:])
+        return cls(memoryview(b''.join((prefix, self.read(count * len(Entry) + size)))))
+
+    def pieces(self, size):
+        """ Generator of compressed payload pieces as they are read """
+        return iter(partial(self.file.read, size), b'')
+
+def harvest(name, names, contents):
+    """
+    (build_id, name) for each name, if contents parse as ELF
+    build_id is None for ELF files without one, such as stripped objects.
+    """
+    try:
+        elf = Elf(contents, name=name)
+    except ElfError:
+        return ()
+    try:
+        build_id = elf.build_id()
+    except ValueError:
+        build_id = None
+    return tuple((build_id, name) for name in names)
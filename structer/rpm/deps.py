@@ -0,0 +1,94 @@
+"""
+Shared library dependency graph across packages
+Packages provide the sonames of their ELF members, and need their Needed entries.
+Both directions are indexed by soname and updated per package,
+so reverse dependency queries are dict and set lookups.
+"""
+
+from threading import Lock
+
+class Graph(object):
+    """
+    Provides and needs of each package, with indexes from soname to packages
+    update replaces everything recorded for a package, and remove forgets it.
+    The graph is guarded by a lock, so it can be shared by threads.
+    """
+    def __init__(self):
+        self.provides, self.needs = {}, {}
+        self.providers, self.consumers = {}, {}
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.provides)
+
+    def __contains__(self, package):
+        return package in self.provides
+
+    def add(self, rpm, package=None, verify=None):
+        """ Update from ELF members of an RPM, keyed by its name unless package is specified """
+        package = str(rpm.header.name) if package is None else package
+        self.update(package, rpm.sonames(verify=verify))
+        return package
+
+    def update(self, package, sonames):
+        """ Replace provides and needs of package from (names, soname, needed) """
+        provides, needs = set(), set()
+        for _, soname, needed in sonames:
+            if soname is not None:
+                provides.add(soname)
+            needs.update(needed)
+        with self.lock:
+            self.forget(package)
+            self.provides[package], self.needs[package] = frozenset(provides), frozenset(needs)
+            for soname in provides:
+                self.providers.setdefault(soname, set()).add(package)
+            for soname in needs:
+                self.consumers.setdefault(soname, set()).add(package)
+
+    def remove(self, package):
+        """ Forget package, if it is present """
+        with self.lock:
+            self.forget(package)
+
+    def forget(self, package):
+        """ Remove index entries of package, with the lock held """
+        for names, index in ((self.provides, self.providers), (self.needs, self.consumers)):
+            for soname in names.pop(package, ()):
+                packages = index[soname]
+                packages.discard(package)
+                if not packages:
+                    del index[soname]
+
+    def provided(self, soname):
+        """ Packages providing soname """
+        with self.lock:
+            return frozenset(self.providers.get(soname, ()))
+
+    def needed(self, soname):
+        """ Packages needing soname """
+        with self.lock:
+            return frozenset(self.consumers.get(soname, ()))
+
+    def dependents(self, package):
+        """ Other packages needing any soname which package provides """
+        with self.lock:
+            found = set()
+            for soname in self.provides.get(package, ()):
+                found.update(self.consumers.get(soname, ()))
+            found.discard(package)
+            return frozenset(found)
+
+    def dependencies(self, package):
+        """ Other packages providing any soname which package needs """
+        with self.lock:
+            found = set()
+            for soname in self.needs.get(package, ()):
+                found.update(self.providers.get(soname, ()))
+            found.discard(package)
+            return frozenset(found)
+
+    def unresolved(self, package):
+        """ Sonames which package needs and no package provides """
+        with self.lock:
+            return frozenset(soname for soname in self.needs.get(package, ())
+                             if soname not in self.providers)
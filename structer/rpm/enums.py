@@ -4,10 +4,11 @@ Tag and HeaderTag members are from
 https://github.com/rpm-software-management/rpm/blob/master/lib/rpmtag.h
 """
 import re
+from array import array
+from sys import byteorder
 from .. import CacheAttr
 from ..data import Int, String, Strings
 from ..enum import Enum
-from ..named import Struct, StructArray
 
 class Type(Enum, Int(length=1)):
     """ RPM lead type """
@@ -54,7 +55,7 @@ class HeaderTag(Enum, Int(length=2)):
     filecolor, fileclass, classdict = range(1140, 1143)
     filedependsx, filedependsn, dependsdict, sourcepkgid, filecontents = range(1143, 1148)
     pretrans, posttrans, pretransprog, posttransprog = range(1151, 1155)
-    filecaps, filedigestalgo = 5010, 5011
+    longfilesizes, filecaps, filedigestalgo = 5008, 5010, 5011
     ordername, orderversion, orderflags = range(5035, 5038)
     recommendname, recommendversion, recommendflags = range(5046, 5049)
     suggestname, suggestversion, suggestflags = range(5049, 5052)
@@ -71,17 +72,23 @@ class TagType(Enum, Int(length=2)):
 
 INTS = re.compile('^int([0-3])$')
 
+TYPECODES = tuple(next(code for code in 'BHILQ' if array(code).itemsize == 1 << length)
+                  for length in range(4))
+
 class Tagger(object):
     """ Fetch functions for TagType """
     def __new__(cls, name):
         fetch = getattr(cls, name, None)
         if fetch:
             return fetch
-        length = int(INTS.match(name).group(1))
-        element = Struct(member=Int(length=length), byteorder=2)
+        code = TYPECODES[int(INTS.match(name).group(1))]
         def ints(payload, count):
-            """ StructArray of specified count scaled by element size """
-            return StructArray(payload[:len(element) * count], element)
+            """ array of specified count, converted from big endian """
+            values = array(code)
+            values.frombytes(payload[:values.itemsize * count])
+            if byteorder == 'little':
+                values.byteswap()
+            return values
         setattr(cls, name, ints)
         return ints
 
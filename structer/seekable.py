@@ -0,0 +1,359 @@
+"""
+Random access to compressed files
+An index of independently compressed frames locates each offset,
+and decompressed blocks are kept in a least recently used cache.
+A frame is decompressed from its start up to the blocks read, so random access
+needs many frames (as in seekable zstd, or multiple block xz), or checkpoints.
+gzip decompression state is checkpointed as it advances, and a cache miss restarts
+from the nearest checkpoint; the xz, zstd, and lz4 decompressors cannot be copied,
+so a single frame in those formats is read again from its start on every miss behind
+the cursor, which makes random access within it impractical.
+The zstd and lz4 codecs are optional, and are skipped if absent.
+"""
+
+import lzma
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect
+from collections import OrderedDict
+from struct import pack, unpack_from
+from threading import Lock
+
+from . import memmap, named
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+CHUNK = 1 << 16
+STRIDE = 1 << 20
+
+class Frames(named.Tuple):
+    """
+    Uncompressed offsets, compressed ranges, and total uncompressed size
+    origin is the start of the enclosing stream, for formats which need it.
+    Frames can be saved (e.g. pickled) and passed to Seekable for reuse.
+    """
+    addr, origin, start, end, size
+
+def varint(value):
+    """ Encode xz multibyte integer """
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def unvarint(mem, offset):
+    """ Decode xz multibyte integer, returning value and next offset """
+    value = shift = 0
+    while True:
+        byte = mem[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, offset
+
+class Codec(ABC):
+    """
+    Decompressor factory for one compression format
+    Subclasses which find a stored index avoid a full decompression pass.
+    The module attribute is None if an optional dependency is absent.
+    """
+    magic = None
+    module = zlib
+
+    @staticmethod
+    @abstractmethod
+    def decompressor():
+        """ Object with decompress method and eof, unused_data attributes """
+
+    def frames(self, mem):
+        """
+        Stored frame index, or None to require a decompression pass
+        Each frame is a tuple of origin, start, end, and uncompressed size.
+        """
+        return None
+
+    def frame(self, mem, origin, start, end, size):
+        """ Compressed bytes of a frame which decompress independently """
+        return mem[start:end]
+
+class GZip(Codec):
+    """ gzip, one frame per member """
+    magic = b'\x1f\x8b'
+
+    @staticmethod
+    def decompressor():
+        return zlib.decompressobj(wbits=31)
+
+class XZ(Codec):
+    """
+    xz, one frame per block, located via the index of each stream
+    Each block is wrapped in a synthesized single block stream.
+    """
+    magic = b'\xfd7zXZ\0'
+    module = lzma
+
+    @staticmethod
+    def decompressor():
+        return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+
+    def frames(self, mem):
+        blocks, end = [], len(mem)
+        while end > 0:
+            while mem[end-4:end] == b'\0\0\0\0':
+                end -= 4
+            backward, = unpack_from('<I', mem, end - 8)
+            index = end - 12 - (backward + 1) * 4
+            count, offset = unvarint(mem, index + 1)
+            records = []
+            for _ in range(count):
+                unpadded, offset = unvarint(mem, offset)
+                size, offset = unvarint(mem, offset)
+                records.append((unpadded, size))
+            start = index - sum(unpadded + (-unpadded % 4) for unpadded, size in records)
+            stream = start - 12
+            for unpadded, size in records:
+                blocks.append((stream, start, start + unpadded, size))
+                start += unpadded + (-unpadded % 4)
+            end = stream
+        return sorted(blocks)
+
+    def frame(self, mem, origin, start, end, size):
+        """
+        Stream header, block, and a one record index and footer
+        end excludes block padding, so the padded block extends to a multiple of four.
+        """
+        header, unpadded = mem[origin:origin + 12], end - start
+        index = b'\0' + varint(1) + varint(unpadded) + varint(size)
+        index += b'\0' * (-len(index) % 4)
+        index += pack('<I', zlib.crc32(index))
+        footer = pack('<I', len(index) // 4 - 1) + header[6:8]
+        footer = pack('<I', zlib.crc32(footer)) + footer + b'YZ'
+        return b''.join((header, mem[start:end + (-unpadded % 4)], index, footer))
+
+class ZStd(Codec):
+    """
+    zstd, one frame per frame, using the seekable format index if present
+    """
+    magic = b'\x28\xb5\x2f\xfd'
+    module = zstandard
+    skippable = range(0x184D2A50, 0x184D2A60)
+
+    @staticmethod
+    def decompressor():
+        return zstandard.ZstdDecompressor().decompressobj()
+
+    def frames(self, mem):
+        if len(mem) < 9 or unpack_from('<I', mem, len(mem) - 4)[0] != 0x8F92EAB1:
+            return None
+        count, flags = unpack_from('<IB', mem, len(mem) - 9)
+        width = 12 if flags & 0x80 else 8
+        table = len(mem) - 9 - count * width
+        frames, start = [], 0
+        for index in range(count):
+            length, size = unpack_from('<II', mem, table + index * width)
+            frames.append((start, start, start + length, size))
+            start += length
+        return frames
+
+class LZ4(Codec):
+    """ lz4, one frame per frame """
+    magic = b'\x04\x22\x4d\x18'
+    module = lz4
+
+    @staticmethod
+    def decompressor():
+        return lz4.frame.LZ4FrameDecompressor()
+
+def codec(mem):
+    """ Codec instance chosen by magic number, or None if uncompressed or unavailable """
+    for cls in (GZip, XZ, ZStd, LZ4):
+        if bytes(mem[:len(cls.magic)]) == cls.magic:
+            return None if cls.module is None else cls()
+    return None
+
+def skip(mem, offset):
+    """ Offset beyond any zstd skippable frames """
+    while len(mem) - offset >= 8:
+        magic, size = unpack_from('<II', mem, offset)
+        if magic not in ZStd.skippable:
+            break
+        offset += 8 + size
+    return offset
+
+class Cursor(object):
+    """
+    Decompression state within one frame, producing consecutive blocks
+    It starts from the last checkpoint before block, discarding output up to a block boundary.
+    """
+    def __init__(self, source, frame, block=0):
+        self.source = source
+        self.frame = frame
+        self.mem = source.codec.frame(source.mem, *source.frame(frame))
+        produced, self.offset, state = source.checkpoint(frame, block * source.blocksize)
+        self.decompressor = source.codec.decompressor() if state is None else state.copy()
+        self.produced = produced
+        self.block = -(-produced // source.blocksize)
+        self.discard = self.block * source.blocksize - produced
+        self.pending = bytearray()
+
+    def __next__(self):
+        blocksize, out = self.source.blocksize, self.pending
+        while len(out) < blocksize and not self.decompressor.eof:
+            chunk = self.mem[self.offset:self.offset + CHUNK]
+            if not chunk:
+                raise EOFError("truncated frame")
+            self.offset += len(chunk)
+            data = self.decompressor.decompress(chunk)
+            self.produced += len(data)
+            self.source.mark(self.frame, self.produced, self.offset, self.decompressor)
+            if self.discard:
+                skipped = min(self.discard, len(data))
+                data, self.discard = data[skipped:], self.discard - skipped
+            out += data
+        block, self.pending = bytes(out[:blocksize]), out[blocksize:]
+        self.block += 1
+        return block
+
+class Seekable(object):
+    """
+    Random access, via slices, to the decompressed contents of a file
+    Slices are returned as memoryview objects of the requested span.
+    blocksize is the granularity of decompression and caching,
+    and cache is the number of blocks kept. Checkpoints, where the codec supports them,
+    are at least STRIDE (or blocksize) bytes of output apart.
+    The cache and cursor are guarded by a lock, so instances can be shared by threads.
+    """
+    def __init__(self, mem, codec, blocksize=1 << 20, cache=64, frames=None):
+        if cache < 1:
+            raise ValueError("cache must hold at least one block")
+        self.mem, self.codec = mem, codec
+        self.blocksize, self.limit = blocksize, cache
+        self.stride, self.checkpoints = max(STRIDE, blocksize), {}
+        self.frames = frames or self.index()
+        self.cache = OrderedDict()
+        self.cursor = None
+        self.lock = Lock()
+
+    def index(self):
+        """
+        Build frame index from stored index if present, else by a decompression pass
+        which also records checkpoints
+        """
+        mem, codec = self.mem, self.codec
+        frames = codec.frames(mem)
+        if frames is None:
+            frames, start = [], skip(mem, 0)
+            while start < len(mem):
+                decompressor, offset, size = codec.decompressor(), start, 0
+                while not decompressor.eof:
+                    chunk = mem[offset:offset + CHUNK]
+                    if not chunk:
+                        raise EOFError("truncated frame")
+                    offset += len(chunk)
+                    size += len(decompressor.decompress(chunk))
+                    self.mark(len(frames), size, offset - start, decompressor)
+                offset -= len(decompressor.unused_data)
+                frames.append((start, start, offset, size))
+                start = skip(mem, offset)
+        addr, total = [], 0
+        for frame in frames:
+            addr.append(total)
+            total += frame[-1]
+        columns = tuple(zip(*frames))[:3] or 3*((),)
+        return Frames(array('Q', addr), *(array('Q', column) for column in columns), total)
+
+    def __len__(self):
+        return self.frames.size
+
+    def frame(self, index):
+        """ origin, start, end, and uncompressed size of indexed frame """
+        frames = self.frames
+        addr = frames.addr
+        end = addr[index + 1] if index + 1 < len(addr) else frames.size
+        return (frames.origin[index], frames.start[index], frames.end[index],
+                end - addr[index])
+
+    def mark(self, frame, produced, offset, decompressor):
+        """
+        Record a checkpoint at offset within frame, after produced bytes of output,
+        if the decompressor can be copied and the last checkpoint is at least stride behind
+        """
+        marks = self.checkpoints.setdefault(frame, [(0, 0, None)])
+        copy = getattr(decompressor, 'copy', None)
+        if copy is not None and not decompressor.eof and produced - marks[-1][0] >= self.stride:
+            marks.append((produced, offset, copy()))
+
+    def checkpoint(self, frame, position):
+        """ (produced, offset, decompressor) of the last checkpoint in frame up to position """
+        marks = self.checkpoints.get(frame, [(0, 0, None)])
+        return marks[bisect([mark[0] for mark in marks], position) - 1]
+
+    def block(self, frame, block):
+        """ Decompressed block, from cache or from the frame cursor """
+        with self.lock:
+            return self.fill(frame, block)
+
+    def fill(self, frame, block):
+        """ Decompressed block, with the lock held """
+        key = frame, block
+        cache = self.cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        cursor, blocksize = self.cursor, self.blocksize
+        if (cursor is None or cursor.frame != frame or cursor.block > block or
+                -(-self.checkpoint(frame, block * blocksize)[0] // blocksize) > cursor.block):
+            cursor = self.cursor = Cursor(self, frame, block)
+        while True:
+            data = next(cursor)
+            cache[frame, cursor.block - 1] = data
+            if len(cache) > self.limit:
+                cache.popitem(last=False)
+            if cursor.block > block:
+                return data
+
+    def read(self, offset, size):
+        """ bytes of specified span, crossing block and frame boundaries as needed """
+        addr, out = self.frames.addr, []
+        while size > 0:
+            frame = bisect(addr, offset) - 1
+            relative = offset - addr[frame]
+            block = self.block(frame, relative // self.blocksize)
+            piece = block[relative % self.blocksize:][:size]
+            if not piece:
+                break
+            out.append(piece)
+            offset += len(piece)
+            size -= len(piece)
+        return b''.join(out)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("slice step must be 1")
+            return memoryview(self.read(start, stop - start))
+        return self.read(range(len(self))[key], 1)[0]
+
+def seekable(name, blocksize=1 << 20, cache=64, frames=None):
+    """
+    Seekable decompressed view of named file if compressed with an available codec
+    Otherwise, a memoryview over a readonly mmap of the file
+    """
+    mem = memmap(name)
+    found = codec(mem)
+    if found is None:
+        return mem
+    return Seekable(mem, found, blocksize, cache, frames)
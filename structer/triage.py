@@ -0,0 +1,40 @@
+"""
+Summarize an ELF core as it is piped from the kernel
+Suitable as a core_pattern helper, e.g. |/usr/bin/core_triage --spill /var/tmp/core.%p
+Threads are printed once the notes arrive, before any load segment is read,
+then the build ID of each mapped module once its headers have been spilled.
+With --early, the rest of the dump is not read.
+"""
+
+from argparse import ArgumentParser
+from sys import stdin
+
+from .elf.stream import Stream
+
+def triage(file, args):
+    """ Print threads and module build IDs of a core read from file """
+    with Stream(file, args.spill, limit=args.limit) as stream:
+        core = stream.core
+        threads = core.threads
+        for pid, signal, pc, sp in zip(threads.pid, threads.signal, threads.pc, threads.sp):
+            print(f"{pid} {signal} {pc:016x} {sp:016x}", flush=True)
+        stream.run(early=True)
+        modules = core.modules
+        for name, build_id, bias in zip(modules.names, modules.build_ids, modules.bias):
+            print(f"{bias:016x} {build_id} {name}", flush=True)
+        if not args.early:
+            stream.run()
+
+def main():
+    """ Print threads and module build IDs of a streamed core """
+    parser = ArgumentParser()
+    parser.add_argument("--spill", type=str, default=None)
+    parser.add_argument("--limit", type=int, default=1 << 30)
+    parser.add_argument("--early", action='store_true')
+    parser.add_argument("file", nargs='?', default='-')
+    args = parser.parse_args()
+    if args.file == '-':
+        triage(stdin.buffer, args)
+    else:
+        with open(args.file, 'rb') as file:
+            triage(file, args)